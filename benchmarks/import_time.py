@@ -0,0 +1,70 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Optional dependencies that must not be needed just to import the brokers. A None entry
+# in sys.modules makes every import of them fail, as if they were not installed.
+HEAVY_MODULES = ['tensorflow', 'ephem']
+# The imports run from the checkout, which has bitbroker unless it is installed.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIMER = '''
+import sys
+sys.modules.update(dict.fromkeys({blocked!r}))
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+'''
+
+
+def time_import(module, blocked=HEAVY_MODULES):
+    """Seconds ``module`` takes to import in a fresh interpreter without ``blocked``."""
+    code = TIMER.format(module=module, blocked=list(blocked))
+    output = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=ROOT
+    )
+    return float(output.stdout)
+
+
+def slowest_imports(module, count=10, blocked=HEAVY_MODULES):
+    """The ``count`` slowest imports of ``module`` as reported by ``python -X importtime``."""
+    code = f'import sys; sys.modules.update(dict.fromkeys({list(blocked)!r})); import {module}'
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+    )
+    rows = []
+    for line in output.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split('|')
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Measure how long importing the brokers takes without heavy dependencies.'
+    )
+    parser.add_argument('--module', default='bitbroker.brokers', help='Module to import.')
+    parser.add_argument('--repeat', default=5, type=int, help='Number of fresh imports.')
+    parser.add_argument(
+        '--limit', default=1.0, type=float, help='Fail if the median import takes longer.'
+    )
+    parser.add_argument('--profile', action='store_true', help='Show the slowest imports.')
+    args = parser.parse_args()
+
+    times = [time_import(args.module) for _ in range(args.repeat)]
+    median = statistics.median(times)
+    print(f'import {args.module}: median {median * 1000:.1f} ms, max {max(times) * 1000:.1f} ms')
+
+    if args.profile:
+        for cumulative, name in slowest_imports(args.module):
+            print(f'{cumulative / 1000:10.1f} ms  {name}')
+
+    if median > args.limit:
+        sys.exit(f'Importing {args.module} took longer than {args.limit} s')
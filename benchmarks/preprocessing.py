@@ -0,0 +1,32 @@
+import argparse
+import os
+import tempfile
+import time
+
+from synthetic import peak_rss_mb
+from synthetic import write_synthetic_candles
+
+from bitbroker.features import CHUNK_SIZE
+from bitbroker.features import load_close
+from bitbroker.features import write_features
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the feature pipeline.')
+    parser.add_argument('--rows', default=5000000, type=int, help='Synthetic 1-minute candles.')
+    parser.add_argument('--chunk-size', default=CHUNK_SIZE, type=int, help='Candles at once.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'synthetic.candles')
+        write_synthetic_candles(source, args.rows, args.chunk_size)
+        print(f'{args.rows} candles generated, peak RSS {peak_rss_mb():.0f} MB')
+
+        dates, close = load_close(source)
+        start = time.perf_counter()
+        path = os.path.join(directory, 'features.candles')
+        store = write_features(dates, close, path, args.chunk_size)
+        elapsed = time.perf_counter() - start
+
+    print(f'{len(store)} feature rows in {elapsed:.2f} s ({args.rows / elapsed:,.0f} candles/s)')
+    print(f'peak RSS {peak_rss_mb():.0f} MB')
@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import peak_rss_mb
+from synthetic import SIZES
+from synthetic import synthetic_candles
+from tabulate import tabulate
+
+from bitbroker import brokers
+from bitbroker.candles import read_candles
+from bitbroker.candles import write_candles
+from bitbroker.equity import get_usd_series
+from bitbroker.indicators import hma
+from bitbroker.indicators import hma_last_value
+from bitbroker.indicators import hma_many
+from bitbroker.indicators import wma
+from bitbroker.run_simulation import simulate
+from bitbroker.sweep import grid
+from bitbroker.sweep import sweep
+
+# Results of --save on the default sizes, compared against unless --baseline says otherwise.
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+PERIOD = 16
+SWEEP_PERIODS = range(2, 50, 6)
+# Event-driven runs go through every candle in Python, 10M of them take too long.
+EVENT_SIZES = ['10k', '1m']
+
+TEST_BROKERS = [
+    brokers.TestSimpleHullBroker,
+    brokers.TestCrossoverHullBroker,
+    brokers.TestNoLossCrossoverHullBroker,
+    brokers.TestJozefHullBroker,
+    brokers.TestHoldlBroker,
+    brokers.TestMoonBroker,
+    brokers.TestReversedMoonBroker,
+]
+VECTORIZED_BROKERS = TEST_BROKERS[:5]
+
+# name: (sizes, setup(candles) returning the arguments of run, run)
+BENCHMARKS = {}
+
+
+def close_of(candles):
+    return (candles['Close'].to_numpy(),)
+
+
+for n in [16, 100]:
+    BENCHMARKS[f'wma_{n}'] = (list(SIZES), close_of, lambda close, n=n: wma(close, n))
+    BENCHMARKS[f'hma_{n}'] = (list(SIZES), close_of, lambda close, n=n: hma(close, n))
+
+BENCHMARKS['hma_many_2_150'] = (
+    list(SIZES),
+    close_of,
+    lambda close: hma_many(close, range(2, 150, 3)),
+)
+
+
+def hma_last_values(close, n=100):
+    # As a Hull broker warming up does, on a window that has just become long enough.
+    window = n + int(n ** 0.5)
+    for end in range(window, len(close) + 1):
+        hma_last_value(close[end - window : end], n)
+
+
+BENCHMARKS['hma_last_value_100'] = (EVENT_SIZES, close_of, hma_last_values)
+
+for broker_cls in TEST_BROKERS:
+    BENCHMARKS[f'simulate_{broker_cls.__name__}'] = (
+        EVENT_SIZES,
+        lambda candles, broker_cls=broker_cls: (candles, broker_cls, PERIOD, 0.001),
+        simulate,
+    )
+for broker_cls in VECTORIZED_BROKERS:
+    BENCHMARKS[f'vectorized_{broker_cls.__name__}'] = (
+        list(SIZES),
+        lambda candles, broker_cls=broker_cls: (candles, broker_cls, PERIOD, 0.001),
+        lambda *args: simulate(*args, mode='vectorized'),
+    )
+
+
+def usd_series_setup(candles):
+    broker, index = simulate(
+        candles, brokers.TestSimpleHullBroker, PERIOD, 0.001, True, mode='vectorized'
+    )
+    return broker, index, candles
+
+
+BENCHMARKS['get_usd_series'] = (list(SIZES), usd_series_setup, get_usd_series)
+
+
+def loading_setup(extension):
+    def setup(candles):
+        # Removed once the benchmark lets go of it.
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, f'data{extension}')
+        write_candles(candles, path)
+        return path, directory
+
+    return setup
+
+
+def load(path, directory):
+    return read_candles(path)
+
+
+BENCHMARKS['load_candle_store'] = (list(SIZES), loading_setup('.candles'), load)
+BENCHMARKS['load_pickle'] = (list(SIZES), loading_setup('.pkl'), load)
+
+
+def parallel_sweep_setup(candles):
+    combinations = grid([brokers.TestSimpleHullBroker], SWEEP_PERIODS, [0, 0.001])
+    return candles, combinations
+
+
+def parallel_sweep(candles, combinations):
+    # The pool of run_parallel_simulation, over the shared memory-mapped candles.
+    import multiprocessing as mp
+
+    from bitbroker import run_parallel_simulation as parallel
+
+    args = [(broker_cls, fee, period) for broker_cls, period, fee in combinations]
+    with tempfile.TemporaryDirectory() as directory:
+        parallel.share_data(candles, directory)
+        with mp.Pool(initializer=parallel.load_shared_data, initargs=(directory,)) as pool:
+            list(pool.imap(parallel.parallel_helper_simulation, args))
+
+
+BENCHMARKS['parallel_sweep'] = (EVENT_SIZES, parallel_sweep_setup, parallel_sweep)
+BENCHMARKS['vectorized_sweep'] = (
+    list(SIZES),
+    lambda candles: (candles['Close'], VECTORIZED_BROKERS, SWEEP_PERIODS, [0, 0.001]),
+    sweep,
+)
+
+
+def measure(name, size, min_time=1.0, max_repeat=1000):
+    """Best time of ``name`` on ``size`` candles, repeated while runs are short."""
+    _, setup, run = BENCHMARKS[name]
+    candles = synthetic_candles(SIZES[size])
+    args = setup(candles)
+
+    times = []
+    while len(times) < max_repeat and sum(times) < min_time:
+        start = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - start)
+
+    seconds = min(times)
+    return {
+        'name': name,
+        'size': size,
+        'seconds': seconds,
+        'candles_per_second': SIZES[size] / seconds,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(name, size):
+    """Measure in a fresh interpreter, so that the peak RSS belongs to this case alone."""
+    command = [sys.executable, __file__, '--measure', name, size]
+    output = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    """Table rows of ``results`` against ``baseline`` and the cases slower by ``threshold``."""
+    previous = {(result['name'], result['size']): result for result in baseline}
+    rows, regressions = [], []
+    for result in results:
+        key = result['name'], result['size']
+        ratio = None
+        if key in previous:
+            ratio = result['seconds'] / previous[key]['seconds']
+            if ratio > threshold:
+                regressions.append(key)
+        rows.append(
+            [
+                *key,
+                result['seconds'],
+                result['candles_per_second'],
+                result['peak_rss_mb'],
+                ratio,
+            ]
+        )
+    return rows, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark indicators, brokers and tools.')
+    parser.add_argument(
+        '--sizes', nargs='+', default=['10k'], choices=list(SIZES), help='Data sizes.'
+    )
+    parser.add_argument('--filter', default='', help='Run benchmarks containing this only.')
+    parser.add_argument('--save', help='Write the results to this JSON file.')
+    parser.add_argument(
+        '--baseline',
+        default=BASELINE,
+        help='Compare against results saved with --save, none if empty.',
+    )
+    parser.add_argument(
+        '--threshold', default=1.2, type=float, help='Slowdown reported as a regression.'
+    )
+    parser.add_argument('--measure', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        sys.exit()
+
+    cases = [
+        (name, size)
+        for name, (sizes, _, _) in BENCHMARKS.items()
+        for size in args.sizes
+        if size in sizes and args.filter in name
+    ]
+    results = []
+    for name, size in cases:
+        results.append(run_isolated(name, size))
+        print(f'{name} {size}: {results[-1]["seconds"]:.3f} s', file=sys.stderr)
+
+    baseline = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    rows, regressions = compare(results, baseline, args.threshold)
+    print(
+        tabulate(
+            rows,
+            headers=['Benchmark', 'Size', 'Time [s]', 'Candles/s', 'Peak RSS [MB]', 'Ratio'],
+            floatfmt=',.3f',
+        )
+    )
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    if regressions:
+        sys.exit(f'Slower than the baseline: {", ".join(map(" ".join, regressions))}')
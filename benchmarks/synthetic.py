@@ -0,0 +1,49 @@
+import os
+import resource
+import sys
+
+import numpy as np
+import pandas as pd
+
+# The benchmarks import this module first. Unless bitbroker is installed, they use the one
+# of the checkout they are in.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SIZES = {'10k': 10000, '1m': 1000000, '10m': 10000000}
+
+
+def candle_chunks(rows, chunk_size=1000000, seed=0):
+    """A random walk of 1-minute candles, in DataFrames of at most ``chunk_size`` rows.
+
+    The walk stays well inside the price range ``run_simulation.load_data`` keeps.
+    """
+    rng = np.random.default_rng(seed)
+    last = np.log(1000)
+    for start in range(0, rows, chunk_size):
+        length = min(chunk_size, rows - start)
+        dates = pd.date_range('20190101', periods=length, freq='min', name='Date')
+        dates += pd.Timedelta(minutes=start)
+        log_close = last + np.cumsum(rng.normal(0, 0.0002, length))
+        last = log_close[-1]
+        yield pd.DataFrame({'Date': dates, 'Close': np.exp(log_close)}, index=dates)
+
+
+def synthetic_candles(rows, seed=0):
+    return pd.concat(candle_chunks(rows, seed=seed))
+
+
+def write_synthetic_candles(path, rows, chunk_size=1000000, seed=0):
+    """Write the candles chunk by chunk to a candle store, to keep memory low."""
+    from bitbroker.candles import CandleStore
+
+    store = None
+    for frame in candle_chunks(rows, chunk_size, seed):
+        if store is None:
+            store = CandleStore.create(path, frame)
+        else:
+            store.append(frame)
+    return store
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
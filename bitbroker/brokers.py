@@ -1,13 +1,16 @@
 from abc import ABC
 from abc import abstractmethod
+from collections import deque
 from collections import namedtuple
 from enum import Enum
+from math import sqrt
 
-import ephem
-import tensorflow as tf
-
+from .buffers import BalanceHistory
+from .buffers import RingBuffer
 from .indicators import hma
 from .indicators import hma_last_value
+from .indicators import StreamingHMA
+from .instrumentation import instrument
 
 Balance = namedtuple('Balance', 'USD BTC')
 Desire = Enum('Desire', 'buy sell none')
@@ -15,28 +18,46 @@ Desire = Enum('Desire', 'buy sell none')
 
 class Broker(ABC):
     def __init__(self, available_data, candle_getter, fee=0):
-        self.available_data = available_data
+        self.available_data = RingBuffer(self._lookback(), available_data)
         self.balance = Balance(1000, 0)
         self.get_fresh_candle = candle_getter
-        self.history = [self.balance]
+        self.history = BalanceHistory([self.balance])
         self.fee = fee
 
+    def _lookback(self):
+        return 1
+
     def isholding(self):
         return self.balance.USD == 0 and self.balance.BTC > 0
 
     @abstractmethod
-    def _get_desire(self):
+    def _get_desire(self, candle):
         raise NotImplementedError
 
     def run(self):
         while True:
-            new_candle = self.get_fresh_candle()
-            self.available_data.append(new_candle['Close'])
+            self.step(self.get_fresh_candle())
+
+    def step(self, candle):
+        self._append(self._get_close(candle))
+
+        desire = self._get_desire(candle)
 
-            desire = self._get_desire()
+        self._act(desire)
+        self.history.append(self.balance)
 
-            self._act(desire)
-            self.history.append(self.balance)
+    def instrument(self, instrumentation=None):
+        """Record per-stage latencies and counters of the following ticks.
+
+        Off unless called, see ``instrumentation.instrument``.
+        """
+        return instrument(self, instrumentation)
+
+    def _get_close(self, candle):
+        return candle['Close']
+
+    def _append(self, close):
+        self.available_data.append(close)
 
     def _act(self, desire):
         if self.isholding() and desire == Desire.sell:
@@ -66,10 +87,18 @@ class Broker(ABC):
 
 
 class NoLossBroker(Broker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_USD = self.balance.USD if self.balance.USD > 0 else None
+
+    def step(self, candle):
+        super().step(candle)
+        # Kept up to date instead of searching the history for it on every sell desire.
+        if self.balance.USD > 0:
+            self._last_USD = self.balance.USD
+
     def _get_last_USD(self):
-        for balance in reversed(self.history):
-            if balance.USD > 0:
-                return balance.USD
+        return self._last_USD
 
     def _act(self, desire):
         if self.isholding() and desire == Desire.sell:
@@ -81,52 +110,6 @@ class NoLossBroker(Broker):
             self._buy()
 
 
-class AIBroker(Broker):
-    def __init__(self, model_path, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.model = tf.keras.models.load_model(model_path)
-        self.offset = 0.00
-
-    def _get_desire(self, candle):
-        prediction = candle['prediction']
-        if prediction > 0.5 + self.offset:
-            return Desire.buy
-        elif prediction < 0.5 - self.offset:
-            return Desire.sell
-        else:
-            return Desire.none
-
-    def run(self):
-        while True:
-            new_candle = self.get_fresh_candle()
-            self.available_data.append(10 ** new_candle['log10close'])
-
-            desire = self._get_desire(new_candle)
-
-            self._act(desire)
-            self.history.append(self.balance)
-
-
-class AIRegressionBroker(Broker):
-    def __init__(self, model_path, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.model = tf.keras.models.load_model(model_path)
-
-    def _get_desire(self, candle):
-        prediction = 10 ** candle['prediction']
-        return Desire.buy if prediction > self.available_data[-1] else Desire.sell
-
-    def run(self):
-        while True:
-            new_candle = self.get_fresh_candle()
-            self.available_data.append(10 ** new_candle['log10close'])
-
-            desire = self._get_desire(new_candle)
-
-            self._act(desire)
-            self.history.append(self.balance)
-
-
 class TestBroker(Broker):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -140,15 +123,40 @@ class TestBroker(Broker):
 
 
 class AbstractHullBroker(Broker):
+    # Hull periods the broker reads, as multiples of hull_period.
+    hull_multipliers = ()
+
     def __init__(self, hull_period, *args, **kwargs):
-        super().__init__(*args, **kwargs)
         self.hull_period = hull_period
+        super().__init__(*args, **kwargs)
+        self.hulls = {}
+        for multiplier in self.hull_multipliers:
+            n = hull_period * multiplier
+            self.hulls[n] = StreamingHMA(n)
+            self.hulls[n].extend(self.available_data)
+
+    def _lookback(self):
+        periods = [self.hull_period * multiplier for multiplier in self.hull_multipliers]
+        return max((n + int(sqrt(n)) for n in periods), default=1)
+
+    def _append(self, close):
+        super()._append(close)
+        for hull in self.hulls.values():
+            hull.update(close)
+
+    def _hma(self, n):
+        hull = self.hulls[n]
+        # Until its windows are full the indicator has no value, keep the warmup of
+        # hma_last_value there.
+        return hull.value if hull.ready else hma_last_value(self.available_data, n)
 
 
 class CrossoverHullBroker(AbstractHullBroker):
-    def _get_desire(self):
-        hma_fast = hma_last_value(self.available_data, self.hull_period)
-        hma_slow = hma_last_value(self.available_data, self.hull_period * 2)
+    hull_multipliers = (1, 2)
+
+    def _get_desire(self, candle):
+        hma_fast = self._hma(self.hull_period)
+        hma_slow = self._hma(self.hull_period * 2)
 
         desire = Desire.buy if hma_fast > hma_slow else Desire.sell
 
@@ -156,9 +164,11 @@ class CrossoverHullBroker(AbstractHullBroker):
 
 
 class CrossoverInverseHullBroker(AbstractHullBroker):
-    def _get_desire(self):
-        hma_fast = hma_last_value(self.available_data, self.hull_period)
-        hma_slow = hma_last_value(self.available_data, self.hull_period * 2)
+    hull_multipliers = (1, 2)
+
+    def _get_desire(self, candle):
+        hma_fast = self._hma(self.hull_period)
+        hma_slow = self._hma(self.hull_period * 2)
 
         desire = Desire.buy if hma_fast < hma_slow else Desire.sell
 
@@ -166,9 +176,11 @@ class CrossoverInverseHullBroker(AbstractHullBroker):
 
 
 class CrossoverJozefComboHullBroker(AbstractHullBroker):
-    def _get_desire(self):
-        hma_fast = hma_last_value(self.available_data, self.hull_period)
-        hma_slow = hma_last_value(self.available_data, self.hull_period * 2)
+    hull_multipliers = (1, 2)
+
+    def _get_desire(self, candle):
+        hma_fast = self._hma(self.hull_period)
+        hma_slow = self._hma(self.hull_period * 2)
 
         desire = Desire.buy if hma_fast > hma_slow else Desire.sell
 
@@ -179,29 +191,28 @@ class CrossoverJozefComboHullBroker(AbstractHullBroker):
 
 
 class SimpleHullBroker(AbstractHullBroker):
-    def _get_desire(self):
-        hma = hma_last_value(self.available_data, self.hull_period)
+    hull_multipliers = (1,)
+
+    def _get_desire(self, candle):
+        hma = self._hma(self.hull_period)
 
         return Desire.sell if self.available_data[-1] < hma else Desire.buy
 
 
 class MoonBroker(AbstractHullBroker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ephem is slow to import, so it is only loaded once a moon broker is created.
+        from .moon import is_waxing
+
+        self._is_waxing = is_waxing
+
     def _get_desire(self, candle):
-        if ephem.previous_full_moon(candle['Date']) < ephem.previous_new_moon(candle['Date']):
+        if self._is_waxing(candle['Date']):
             return Desire.buy
         else:
             return Desire.sell
 
-    def run(self):
-        while True:
-            new_candle = self.get_fresh_candle()
-            self.available_data.append(new_candle['Close'])
-
-            desire = self._get_desire(new_candle)
-
-            self._act(desire)
-            self.history.append(self.balance)
-
 
 class ReversedMoonBroker(MoonBroker):
     def _get_desire(self, candle):
@@ -215,16 +226,18 @@ class ReversedMoonBroker(MoonBroker):
 
 
 class JozefHullBroker(AbstractHullBroker):
+    hull_multipliers = (1,)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.trendUP = True
-        self.past_hma = hma(self.available_data, self.hull_period).tolist()
+        self.past_hma = deque(hma(self.available_data, self.hull_period).tolist(), maxlen=3)
 
-    def _get_desire(self):
+    def _get_desire(self, candle):
 
         last_trend = self.trendUP
 
-        hma_value = hma_last_value(self.available_data, self.hull_period)
+        hma_value = self._hma(self.hull_period)
         self.past_hma.append(hma_value)
 
         self.trendUP = self.past_hma[-1] > self.past_hma[-3]
@@ -237,7 +250,7 @@ class JozefHullBroker(AbstractHullBroker):
 
 # TODO fix later to inherit only from broker
 class HoldlBroker(AbstractHullBroker):
-    def _get_desire(self):
+    def _get_desire(self, candle):
         return Desire.buy
 
 
@@ -267,11 +280,3 @@ class TestMoonBroker(TestBroker, MoonBroker):
 
 class TestReversedMoonBroker(TestBroker, ReversedMoonBroker):
     pass
-
-
-class TestAIBroker(TestBroker, AIBroker):
-    pass
-
-
-class TestAIRegressionBroker(TestBroker, AIRegressionBroker):
-    pass
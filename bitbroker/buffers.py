@@ -0,0 +1,102 @@
+from array import array
+from bisect import bisect_right
+from itertools import islice
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity float64 buffer keeping only the newest ``capacity`` values.
+
+    Every value is written twice, ``capacity`` apart, so the retained values are always
+    one contiguous slice and indexing returns NumPy views without copying.
+    """
+
+    def __init__(self, capacity, data=()):
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity)
+        self._count = 0
+        self.extend(data)
+
+    def append(self, x):
+        pos = self._count % self.capacity
+        self._data[pos] = self._data[pos + self.capacity] = x
+        self._count += 1
+
+    def extend(self, data):
+        for x in list(data)[-self.capacity :]:
+            self.append(x)
+
+    def view(self):
+        head = self._count % self.capacity + self.capacity
+        return self._data[head - len(self) : head]
+
+    def tolist(self):
+        return self.view().tolist()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def __getitem__(self, key):
+        return self.view()[key]
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.view(), dtype=dtype)
+
+
+class BalanceHistory:
+    """Per-tick balances stored as trade events only.
+
+    A balance is kept once for the tick at which it took effect; the full series is
+    rebuilt on demand by repeating it until the next event.
+    """
+
+    def __init__(self, balances=()):
+        self._ticks = array('q')
+        self._events = []
+        self._length = 0
+        for balance in balances:
+            self.append(balance)
+
+    def append(self, balance, count=1):
+        if count <= 0:
+            return
+        if not self._events or balance != self._events[-1]:
+            self._ticks.append(self._length)
+            self._events.append(balance)
+        self._length += count
+
+    def events(self):
+        return self._events
+
+    def to_arrays(self):
+        counts = np.diff(np.append(self._ticks, self._length))
+        events = np.array(self._events, dtype=float).reshape(-1, 2)
+        return np.repeat(events[:, 0], counts), np.repeat(events[:, 1], counts)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return list(islice(self, *key.indices(self._length)))
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError('history index out of range')
+        return self._events[bisect_right(self._ticks, key) - 1]
+
+    def __iter__(self):
+        ends = list(self._ticks[1:]) + [self._length]
+        for start, end, balance in zip(self._ticks, ends, self._events):
+            for _ in range(end - start):
+                yield balance
+
+    def __eq__(self, other):
+        if isinstance(other, BalanceHistory):
+            same_events = self._ticks == other._ticks and self._events == other._events
+            return self._length == other._length and same_events
+        return list(self) == list(other)
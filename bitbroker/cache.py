@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_DIR = os.environ.get(
+    'BITBROKER_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'bitbroker')
+)
+DISK_BUDGET = 2 * 1024 ** 3
+
+
+def source_key(data):
+    """Hash of the content of an input array, identifying it across runs and processes."""
+    data = np.ascontiguousarray(data)
+    digest = hashlib.blake2b(data.dtype.str.encode(), digest_size=16)
+    digest.update(data.view(np.uint8).ravel())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Computed columns stored on disk under a hash of their input and parameters.
+
+    The hash includes the ``version`` of the code computing a column, so bumping it after
+    a change to the results leaves the columns computed before unused. Files are touched
+    when read, and the least recently used ones are removed whenever the cache grows over
+    ``budget`` bytes. Files are written atomically, so any number of processes can share
+    one cache directory.
+    """
+
+    def __init__(self, directory=os.path.join(CACHE_DIR, 'features'), budget=DISK_BUDGET):
+        self.directory = directory
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, source, name, params, version=0):
+        key = json.dumps([source, name, version, params], sort_keys=True)
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f'{digest}.npy')
+
+    def get(self, source, name, params, compute, version=0):
+        """Column ``name`` of the input hashed as ``source``, computed on a miss.
+
+        Cached columns are returned read-only and memory-mapped.
+        """
+        path = self.path(source, name, params, version)
+        try:
+            column = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        else:
+            self.hits += 1
+            return column
+
+        self.misses += 1
+        column = np.asarray(compute())
+        self._write(path, column)
+        return column
+
+    def _write(self, path, column):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, column)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def entries(self):
+        """Cached files as ``(last use, size, path)``, least recently used first."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npy'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.budget:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMAT = 'bitbroker-candles'
+VERSION = 1
+EXTENSION = '.candles'
+META_FILE = 'meta.json'
+JSON_COLUMNS = ['Date', 'Low', 'High', 'Open', 'Close', 'Volume']
+
+
+def _bound(value, side):
+    """Turn a ``.loc``-style date bound into a timestamp.
+
+    Strings are read as periods, so ``"20190501"`` as an upper bound covers the whole
+    day, just like ``data.loc[:"20190501"]``.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        period = pd.Period(value)
+        return period.start_time if side == 'left' else period.end_time
+    return pd.Timestamp(value)
+
+
+class CandleStore:
+    """Directory of uncompressed column files described by a small JSON header.
+
+    Columns are memory-mapped on access and rows are sorted by ``Date``, so a date range
+    is located by binary search without reading the rest of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != FORMAT:
+            raise ValueError(f'{path} is not a candle store')
+
+    @classmethod
+    def create(cls, path, frame, attrs=None):
+        frame = _with_date_column(frame)
+        os.makedirs(path, exist_ok=True)
+
+        meta = {
+            'format': FORMAT,
+            'version': VERSION,
+            'length': 0,
+            'columns': {column: frame[column].to_numpy().dtype.str for column in frame},
+            'attrs': attrs or {},
+        }
+        for column in meta['columns']:
+            open(cls._column_path(path, column), 'wb').close()
+        cls._write_meta(path, meta)
+
+        store = cls(path)
+        store.append(frame)
+        return store
+
+    @staticmethod
+    def _column_path(path, column):
+        return os.path.join(path, f'{column}.bin')
+
+    @staticmethod
+    def _write_meta(path, meta):
+        tmp_path = os.path.join(path, META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp_path, os.path.join(path, META_FILE))
+
+    @property
+    def columns(self):
+        return list(self.meta['columns'])
+
+    @property
+    def attrs(self):
+        return self.meta['attrs']
+
+    def __len__(self):
+        return self.meta['length']
+
+    def column(self, name):
+        dtype = np.dtype(self.meta['columns'][name])
+        if len(self) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(
+            self._column_path(self.path, name), dtype=dtype, mode='r', shape=(len(self),)
+        )
+
+    def rows(self, start=None, end=None):
+        dates = self.column('Date')
+        start, end = _bound(start, 'left'), _bound(end, 'right')
+        first = 0 if start is None else np.searchsorted(dates, start.to_datetime64(), 'left')
+        last = len(self) if end is None else np.searchsorted(dates, end.to_datetime64(), 'right')
+        return slice(int(first), int(last))
+
+    def arrays(self, start=None, end=None, columns=None):
+        rows = self.rows(start, end)
+        return {column: self.column(column)[rows] for column in columns or self.columns}
+
+    def to_frame(self, start=None, end=None, columns=None):
+        columns = columns or self.columns
+        arrays = self.arrays(start, end, set(columns) | {'Date'})
+        frame = pd.DataFrame(
+            {column: np.array(arrays[column]) for column in columns},
+            index=pd.DatetimeIndex(np.array(arrays['Date']), name='Date'),
+        )
+        return frame
+
+    def last_date(self):
+        return pd.Timestamp(self.column('Date')[-1]) if len(self) else None
+
+    def append(self, frame, attrs=None):
+        """Add rows after the last one, and update ``attrs`` in the same header write."""
+        frame = _with_date_column(frame)
+        if set(frame.columns) != set(self.columns):
+            raise ValueError(f'Columns {list(frame.columns)} do not match {self.columns}')
+
+        dates = frame['Date'].to_numpy()
+        last = self.last_date()
+        if np.any(np.diff(dates) <= np.timedelta64(0)) or (
+            last is not None and len(dates) and dates[0] <= last.to_datetime64()
+        ):
+            raise ValueError('Candles must be appended in strictly increasing Date order')
+
+        # Written after the rows of the header, over whatever an interrupted append left
+        # at the end of a column, so that the columns stay aligned.
+        for column, dtype in self.meta['columns'].items():
+            with open(self._column_path(self.path, column), 'r+b') as f:
+                f.truncate(len(self) * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(frame[column].to_numpy().astype(dtype).tobytes())
+
+        self.meta['length'] += len(frame)
+        self.meta['attrs'].update(attrs or {})
+        self._write_meta(self.path, self.meta)
+
+
+def _with_date_column(frame):
+    if 'Date' not in frame.columns:
+        frame = frame.assign(Date=frame.index)
+    return frame
+
+
+def is_candle_store(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def read_candles(path, start=None, end=None, columns=None):
+    """Load ``path`` as a DataFrame, from a candle store or from a pickle."""
+    if is_candle_store(path):
+        return CandleStore(path).to_frame(start, end, columns)
+
+    data = pd.read_pickle(path)
+    data = data.loc[start:end] if start is not None or end is not None else data
+    return data[columns] if columns else data
+
+
+def write_candles(frame, path):
+    """Save ``frame`` to ``path``, as a candle store unless it names a pickle."""
+    if '.pkl' in os.path.basename(path):
+        frame.to_pickle(path)
+    else:
+        CandleStore.create(path, frame)
+
+
+def tagged_path(path, tag):
+    """``data.X.GRAN900.pkl.xz`` or ``data.X.GRAN900.candles`` with ``tag`` inserted."""
+    path = path.rstrip(os.sep)
+    for extension in [EXTENSION, '.pkl.xz', '.pkl', '.json']:
+        if path.endswith(extension):
+            return f'{path[: -len(extension)]}.{tag}{extension}'
+    return f'{path}.{tag}'
+
+
+def from_json(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    frame = pd.DataFrame(data, columns=JSON_COLUMNS)
+    frame['Date'] = pd.to_datetime(frame['Date'], unit='s')
+    frame.index = pd.DatetimeIndex(frame['Date'])
+    return frame
+
+
+def convert(path, output=None):
+    """Convert a ``.pkl.xz`` frame or a ``get_historic_data`` JSON dump to a store."""
+    frame = from_json(path) if path.endswith('.json') else pd.read_pickle(path)
+    frame = _with_date_column(frame)
+    frame = frame.iloc[np.argsort(frame['Date'].to_numpy(), kind='stable')]
+    frame = frame[~frame['Date'].duplicated().to_numpy()]
+
+    if output is None:
+        for extension in ['.pkl.xz', '.pkl', '.json']:
+            if path.endswith(extension):
+                output = path[: -len(extension)] + EXTENSION
+                break
+        else:
+            output = path + EXTENSION
+
+    return CandleStore.create(output, frame)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert candle data to a candle store.')
+    parser.add_argument('paths', nargs='+', help='.pkl.xz or JSON files to convert.')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        store = convert(path)
+        print(f'{path} -> {store.path} ({len(store)} candles)')
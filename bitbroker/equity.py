@@ -0,0 +1,49 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+EquityCurve = namedtuple('EquityCurve', 'usd drawdown returns exposure')
+
+
+def equity_curve(usd, btc, close):
+    """USD value of a balance history, with its drawdown, returns and exposure.
+
+    A balance is worth its USD if it holds any, otherwise its BTC at the close of the same
+    candle. Drawdown is the loss from the highest value so far, returns are relative to the
+    previous value, 0 for the first one, and exposure is the share of the value in BTC.
+    """
+    usd, btc = np.asarray(usd, dtype=float), np.asarray(btc, dtype=float)
+    held = btc * np.asarray(close, dtype=float)
+    value = np.where(usd > 0, usd, held)
+
+    returns = np.zeros(len(value))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = value / np.maximum.accumulate(value) - 1
+        returns[1:] = value[1:] / value[:-1] - 1
+        exposure = held / (usd + held)
+
+    return EquityCurve(value, drawdown, returns, exposure)
+
+
+def broker_equity(broker, close):
+    """Equity curve of ``broker`` after every candle, ``close`` holding their closes."""
+    usd, btc = broker.history.to_arrays()
+    return equity_curve(usd[1:], btc[1:], close)
+
+
+def get_usd_values(broker, close):
+    return broker_equity(broker, close).usd
+
+
+def get_usd_series(broker, index, raw_data):
+    """USD value of ``broker`` after each candle of ``index``, labels of ``raw_data``."""
+    close = raw_data['Close'].loc[index].to_numpy()
+    return pd.Series(get_usd_values(broker, close), index=index)
+
+
+def btc_values(values, close, normalization_ratio=1):
+    """USD ``values``, one column per broker, converted to BTC at each ``close``."""
+    close = np.asarray(close, dtype=float)
+    values = np.asarray(values, dtype=float)
+    return values / close.reshape((-1,) + (1,) * (values.ndim - 1)) * normalization_ratio
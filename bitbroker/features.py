@@ -0,0 +1,128 @@
+from functools import partial
+from math import sqrt
+
+import numpy as np
+import pandas as pd
+
+from .cache import source_key
+from .candles import CandleStore
+from .candles import is_candle_store
+from .candles import read_candles
+from .indicators import hull_rsi
+from .indicators import HULL_RSI_VERSION
+from .indicators import rsi
+from .indicators import RSI_VERSION
+
+CHUNK_SIZE = 250000
+RSI_PERIOD = 14
+
+
+def load_close(path):
+    """Dates and closes of ``path``, memory-mapped when it is a candle store."""
+    if is_candle_store(path):
+        store = CandleStore(path)
+        return store.column('Date'), store.column('Close')
+
+    data = read_candles(path, columns=['Close'])
+    return data.index.to_numpy(), data['Close'].to_numpy()
+
+
+def context_length(rsi_period=RSI_PERIOD):
+    """Candles before a chunk needed to compute its features as if the data were whole.
+
+    The Hull RSI reads a fixed window. The RSI smoothing weighs a candle ``k`` steps back
+    by ``(1 - 1 / period) ** k``, which is far below float precision after 50 periods.
+    """
+    return max(50 * rsi_period, rsi_period + int(sqrt(rsi_period))) + 1
+
+
+# Indicator columns by name, computed from the closes, the all-time high before them and
+# the RSI period.
+INDICATORS = {
+    '%_ath': lambda close, ath, period: close / np.maximum(np.maximum.accumulate(close), ath),
+    'log10close': lambda close, ath, period: np.log10(close),
+    'RSI': lambda close, ath, period: rsi(close, period),
+    'HullRSI': lambda close, ath, period: hull_rsi(close, period),
+}
+# Versions of the indicators, see FeatureCache.
+VERSIONS = {'%_ath': 1, 'log10close': 1, 'RSI': RSI_VERSION, 'HullRSI': HULL_RSI_VERSION}
+
+
+def compute_indicators(close, ath=0.0, rsi_period=RSI_PERIOD):
+    return {name: compute(close, ath, rsi_period) for name, compute in INDICATORS.items()}
+
+
+def compute_features(
+    dates, close, ath=0.0, next_close=np.nan, rsi_period=RSI_PERIOD, indicators=None
+):
+    """Features of the candles ``close``, without dropping incomplete rows.
+
+    ``ath`` is the all-time high before the first candle and ``next_close`` the close after
+    the last one. ``indicators`` may hold the already computed ``compute_indicators``.
+    """
+    dates = pd.DatetimeIndex(dates, name='Date')
+    close = np.asarray(close, dtype=np.float64)
+    previous = np.concatenate(([np.nan], close[:-1]))
+    y = np.append(close[1:], next_close)
+    gain = previous / close - 1
+
+    if indicators is None:
+        indicators = compute_indicators(close, ath, rsi_period)
+    features = dict(indicators)
+    dayofweek, quarter = dates.dayofweek.to_numpy(), dates.quarter.to_numpy()
+    for day in range(1, 7):
+        features[f'dayofweek_{day}'] = (dayofweek == day).astype(np.uint8)
+    for q in range(2, 5):
+        features[f'quarter_{q}'] = (quarter == q).astype(np.uint8)
+
+    features['y'] = y
+    features['%y'] = np.append(gain[1:], close[-1:] / next_close - 1)
+    features['log10y'] = np.log10(y)
+    features['booly'] = y > close
+    features['%gain'] = gain
+    return pd.DataFrame(features, index=dates)
+
+
+def preprocess(dates, close, chunk_size=CHUNK_SIZE, rsi_period=RSI_PERIOD):
+    """Yield the complete feature rows of the candles, one chunk of candles at a time.
+
+    Each chunk is computed together with the candles just before it, so the result does
+    not depend on ``chunk_size`` beyond rounding.
+    """
+    context = context_length(rsi_period)
+    ath = 0.0
+    for start in range(0, len(close), chunk_size):
+        end = min(start + chunk_size, len(close))
+        first = max(0, start - context)
+
+        chunk_close = np.asarray(close[first:end], dtype=np.float64)
+        next_close = close[end] if end < len(close) else np.nan
+        features = compute_features(dates[first:end], chunk_close, ath, next_close, rsi_period)
+        ath = max(ath, chunk_close.max())
+
+        yield features.iloc[start - first :].dropna()
+
+
+def write_features(dates, close, path, chunk_size=CHUNK_SIZE, rsi_period=RSI_PERIOD):
+    """Store the features of the candles at ``path`` as a candle store."""
+    store = None
+    for features in preprocess(dates, close, chunk_size, rsi_period):
+        if store is None:
+            store = CandleStore.create(path, features, attrs={'rsi_period': rsi_period})
+        else:
+            store.append(features)
+    return store
+
+
+def cached_features(dates, close, cache, rsi_period=RSI_PERIOD):
+    """Complete feature rows of all the candles, with the indicators kept in ``cache``."""
+    close = np.asarray(close, dtype=np.float64)
+    source = source_key(close)
+    params = {'rsi_period': rsi_period}
+    indicators = {
+        name: cache.get(
+            source, name, params, partial(compute, close, 0.0, rsi_period), VERSIONS[name]
+        )
+        for name, compute in INDICATORS.items()
+    }
+    return compute_features(dates, close, rsi_period=rsi_period, indicators=indicators).dropna()
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+GAP_COLUMNS = ['start', 'end', 'missing']
+
+
+def to_seconds(dates):
+    return np.asarray((pd.DatetimeIndex(dates) - pd.Timestamp(0)) // pd.Timedelta('1s'))
+
+
+def duplicated(timestamps):
+    """Mask of candles repeating the timestamp of the candle right before them."""
+    timestamps = np.asarray(timestamps)
+    return np.diff(timestamps, prepend=timestamps[:1] - 1) == 0
+
+
+def drop_duplicates(data, timestamps=None):
+    """Drop repeated candles from ``data``, a list of candles or a DataFrame."""
+    if isinstance(data, pd.DataFrame):
+        timestamps = to_seconds(data['Date']) if timestamps is None else timestamps
+        return data[~duplicated(timestamps)]
+
+    timestamps = [candle[0] for candle in data] if timestamps is None else timestamps
+    return [data[i] for i in np.flatnonzero(~duplicated(timestamps))]
+
+
+def find_gaps(timestamps, granularity):
+    """Report every place where consecutive candles are more than ``granularity`` apart.
+
+    ``timestamps`` are in seconds and may be sorted either way. Returns a DataFrame with the
+    dates of the candles around each gap and the number of candles missing in between.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    step = np.abs(np.diff(timestamps))
+    at = np.flatnonzero(step > granularity)
+
+    bounds = np.sort(np.stack((timestamps[at], timestamps[at + 1])), axis=0)
+    return pd.DataFrame(
+        {
+            'start': pd.to_datetime(bounds[0], unit='s'),
+            'end': pd.to_datetime(bounds[1], unit='s'),
+            'missing': step[at] // granularity - 1,
+        },
+        columns=GAP_COLUMNS,
+    )
+
+
+def fill_gaps(frame, granularity, method='ffill'):
+    """Reindex a Date-indexed candle frame to one row every ``granularity`` seconds.
+
+    ``ffill`` carries the last close over the missing candles with zero volume, ``mark``
+    leaves them empty and flags them in a boolean ``gap`` column.
+    """
+    if method not in ['ffill', 'mark']:
+        raise ValueError(f'Unknown gap fill method: {method}')
+
+    frame = frame.sort_index()
+    index = pd.date_range(
+        frame.index[0], frame.index[-1], freq=pd.Timedelta(seconds=granularity), name='Date'
+    )
+    missing = ~index.isin(frame.index)
+    frame = frame.reindex(index)
+
+    if 'Date' in frame:
+        frame['Date'] = index
+    if method == 'mark':
+        frame['gap'] = missing
+        return frame
+
+    frame['Close'] = frame['Close'].ffill()
+    for column in ['Open', 'High', 'Low']:
+        if column in frame:
+            frame[column] = frame[column].fillna(frame['Close'])
+    if 'Volume' in frame:
+        frame['Volume'] = frame['Volume'].fillna(0)
+
+    return frame
+
+
+def print_gap_report(gaps, total, max_rows=20):
+    if len(gaps):
+        print(gaps.to_string(max_rows=max_rows))
+        print()
+    print(f'Summary:\nTotal gathered entries: {total}\nGaps count: {len(gaps)}')
+    print(f'Missing entries: {gaps["missing"].sum()}')
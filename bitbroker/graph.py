@@ -1,11 +1,12 @@
 import mplfinance as mpf
-import pandas as pd
+
+from bitbroker.candles import read_candles
 
 
 def main():
-    # data = pd.read_pickle('data/data.BTC-USD.2016-01-01.GRAN900.brokers_inv_jozef_combo.pkl.xz')
-    # data = pd.read_pickle('data/data.bitcoinchartsBTC-USD.2011.GRAN60.simple.pkl.xz')
-    data = pd.read_pickle('data/data.BTC-USD.2016-01-01.GRAN86400.moon.pkl.xz')
+    # data = read_candles('data/data.BTC-USD.2016-01-01.GRAN900.brokers_inv_jozef_combo.pkl.xz')
+    # data = read_candles('data/data.bitcoinchartsBTC-USD.2011.GRAN60.simple.pkl.xz')
+    data = read_candles('data/data.BTC-USD.2016-01-01.GRAN86400.moon.pkl.xz')
     # data = data[:"20190501"]
     holdl = mpf.make_addplot(data['TestHoldlBroker_0.0000_0'])
     cross = mpf.make_addplot(data['TestMoonBroker_0.0010_0'])
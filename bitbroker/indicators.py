@@ -1,6 +1,14 @@
+from collections import namedtuple
 from math import sqrt
 
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# Versions of the indicators, in the keys of their cached series. Bump the version of an
+# indicator, and of those using it, whenever its results change.
+HMA_VERSION = 2
+RSI_VERSION = 1
+HULL_RSI_VERSION = 2
 
 
 def wma_last_value(data, n):
@@ -11,8 +19,80 @@ def wma_last_value(data, n):
     return conv[0]
 
 
+# Shortest block of outputs sharing prefix sums, see _block_sums.
+MIN_BLOCK = 16
+
+BlockSums = namedtuple('BlockSums', 'data plain weighted offsets block longest')
+
+
+def _block_sums(data, longest):
+    """Prefix sums of ``data`` and ``i * data`` for weighted windows up to ``longest``.
+
+    Any window sum is a difference of two prefix sums, but over a whole long series the
+    prefix sums grow with its length, the weighted one with its square, and the
+    difference loses digits to cancellation. So the outputs are cut into blocks of
+    ``2 * longest`` ends and every block sums only its own inputs, the ``longest - 1``
+    before it included, with local indices and less its first value. The sums stay
+    within a few windows of the data around them, which bounds the error of a window by
+    some ulps of the price moves in its block, however long the series.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    block = max(2 * longest, MIN_BLOCK)
+    blocks = -(-len(data) // block)
+
+    # Padded with the edge values, which are zero once the offsets are subtracted. The
+    # first column of the rows is zero too, so that the sums start with an empty sum.
+    edges = data[[0, -1]] if len(data) else np.zeros(2)
+    padded = np.concatenate(
+        (np.full(longest, edges[0]), data, np.full(blocks * block - len(data), edges[1]))
+    )
+    if blocks == 1:
+        rows = padded[None, :]
+    else:
+        step = padded.strides[0]
+        rows = as_strided(padded, (blocks, block + longest), (block * step, step))
+    offsets = data[::block]
+    plain = rows - offsets[:, None]
+    plain[:, 0] = 0
+
+    positions = np.arange(-1, block + longest - 1)
+    weighted = plain * positions
+    np.cumsum(weighted, axis=1, out=weighted)
+    np.cumsum(plain, axis=1, out=plain)
+    # Weighted by the distance to the position before the end, so that a window of n
+    # ending at e has the weights 1..n in weighted[e] - weighted[e - n] + n * plain[e].
+    weighted -= positions * plain
+
+    return BlockSums(data, plain, weighted, offsets, block, longest)
+
+
+def _wma(sums, n):
+    if n == 1:
+        return sums.data.copy()
+    if len(sums.data) < n:
+        return np.empty(0)
+
+    # The windows ending in a block, as the sums up to their end and up to their start.
+    end = slice(sums.longest, sums.longest + sums.block)
+    start = slice(sums.longest - n, sums.longest - n + sums.block)
+    values = sums.weighted[:, end] - sums.weighted[:, start]
+    values += n * sums.plain[:, end]
+
+    values /= n * (n + 1) // 2
+    values += sums.offsets[:, None]
+    return values.ravel()[n - 1 : len(sums.data)]
+
+
 def wma(data, n):
+    """Weighted moving average over windows of ``n``, one value per complete window.
+
+    Computed from prefix sums in O(len(data)) whatever ``n``, see ``_block_sums``.
+    """
+    return _wma(_block_sums(data, n), n)
 
+
+def _wma_convolve(data, n):
+    # O(len(data) * n), but faster than the prefix sums on the few windows of a last value.
     mask = np.arange(n) + 1
 
     conv = np.convolve(data, mask[::-1], mode='valid') / sum(mask)
@@ -22,8 +102,8 @@ def wma(data, n):
 def hma_last_value(data, n):
 
     sub_data = data[-(n + int(sqrt(n))) :]
-    full = wma(sub_data, n)
-    half = wma(sub_data, n // 2)
+    full = _wma_convolve(sub_data, n)
+    half = _wma_convolve(sub_data, n // 2)
     aux = 2 * half[-len(full) :] - full
 
     hull = wma_last_value(aux, int(sqrt(n)))
@@ -31,12 +111,188 @@ def hma_last_value(data, n):
     return hull
 
 
+def _hma(sums, n):
+    full = _wma(sums, n)
+    if len(full) == 0:
+        return np.empty(0)
+    half = _wma(sums, n // 2)
+    aux = 2 * half[-len(full) :] - full
+
+    return wma(aux, int(sqrt(n)))
+
+
 def hma(data, n):
 
-    full = wma(data, n)
-    half = wma(data, n // 2)
-    aux = 2 * half[-len(full) :] - full
+    return _hma(_block_sums(data, n), n)
 
-    hull = wma(aux, int(sqrt(n)))
 
-    return hull
+def hma_many(data, periods):
+    """Hull moving averages of ``data`` for all ``periods``, one row per period.
+
+    The rows have the length of ``data`` and are NaN until the first complete average.
+    Prefix sums of ``data`` are shared by all the periods down to half of the longest one
+    using them; shorter windows would lose precision in sums sized for the longest. Each
+    weighted average is computed once, the half window of a period being the full window
+    of another one, as with ``n`` and ``2 * n``.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    result = np.full((len(periods), len(data)), np.nan)
+    # Half windows kept for the periods still to come, longest periods first.
+    halves = {}
+    wanted = set(periods)
+    sums = None
+    for i in sorted(range(len(periods)), key=lambda i: -periods[i]):
+        n = periods[i]
+        if sums is None or 2 * n < sums.longest:
+            sums = _block_sums(data, n)
+        full = halves.pop(n, None)
+        full = _wma(sums, n) if full is None else full
+        if len(full) == 0:
+            continue
+        half = halves.get(n // 2)
+        if half is None:
+            half = _wma(sums, n // 2)
+            if n // 2 in wanted:
+                halves[n // 2] = half
+        aux = 2 * half[-len(full) :] - full
+
+        hull = wma(aux, int(sqrt(n)))
+        result[i, len(data) - len(hull) :] = hull
+    return result
+
+
+def decayed_sum(data, decay, initial=0.0, block=256):
+    """``y[t] = data[t] + decay * y[t - 1]`` for all ``t`` at once, with ``y[-1] = initial``.
+
+    Inside blocks the recurrence is a cumulative sum of ``data / decay ** t`` scaled back by
+    ``decay ** t``, with blocks short enough for the scale to stay far from overflow. Only
+    the carry from one block to the next is computed in a loop.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    length = len(data)
+    if length == 0 or decay == 0:
+        return data + decay * initial
+
+    # Keep decay ** -block below 1e250.
+    block = max(1, min(block, int(250 / -np.log10(decay)) if decay < 1 else block))
+    blocks = np.zeros(-(-length // block) * block)
+    blocks[:length] = data
+    blocks = blocks.reshape(-1, block)
+
+    powers = decay ** np.arange(1, block + 1)
+    local = np.cumsum(blocks / powers, axis=1) * powers
+
+    carry = np.empty(len(blocks))
+    previous = initial
+    for i, end in enumerate(local[:, -1].tolist()):
+        carry[i] = previous
+        previous = end + powers[-1] * previous
+
+    return (local + carry[:, None] * powers).ravel()[:length]
+
+
+def _ewm_mean(data, alpha):
+    # pandas' ewm(alpha=alpha, adjust=True).mean()
+    decay = 1 - alpha
+    return decayed_sum(data, decay) / decayed_sum(np.ones(len(data)), decay)
+
+
+def _gains_losses(data):
+    delta = np.diff(np.asarray(data, dtype=np.float64))
+    return np.maximum(delta, 0), np.maximum(-delta, 0)
+
+
+def rsi(data, period=14):
+    """Relative strength index with Wilder's smoothing, like finta's ``TA.RSI``.
+
+    Has the length of ``data``, the first value is NaN.
+    """
+    gain, loss = _gains_losses(data)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        strength = _ewm_mean(gain, 1 / period) / _ewm_mean(loss, 1 / period)
+    return np.concatenate(([np.nan], 100 - 100 / (1 + strength)))
+
+
+def hull_rsi(data, period=14):
+    """RSI with the gains and losses smoothed by a Hull moving average.
+
+    Has the length of ``data`` and is NaN until enough data for the first average.
+    """
+    gain, loss = _gains_losses(data)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        strength = hma(gain, period) / hma(loss, period)
+    padding = np.full(len(data) - len(strength), np.nan)
+    return np.concatenate((padding, 100 - 100 / (1 + strength)))
+
+
+class StreamingWMA:
+    def __init__(self, n):
+        self.n = n
+        self.weights = np.arange(n) + 1
+        self.divisor = self.weights.sum()
+        self.window = np.zeros(n)
+        self.count = 0
+        self.plain_sum = 0.0
+        self.weighted_sum = 0.0
+
+    @property
+    def ready(self):
+        return self.count >= self.n
+
+    @property
+    def value(self):
+        return self.weighted_sum / self.divisor if self.ready else np.nan
+
+    def update(self, x):
+        pos = self.count % self.n
+
+        if self.ready:
+            self.weighted_sum += self.n * x - self.plain_sum
+            self.plain_sum += x - self.window[pos]
+        else:
+            self.weighted_sum += (pos + 1) * x
+            self.plain_sum += x
+
+        self.window[pos] = x
+        self.count += 1
+
+        # The window is in chronological order once per turn, recompute the running
+        # sums from it there so that rounding errors cannot accumulate.
+        if pos == self.n - 1:
+            self.plain_sum = self.window.sum()
+            self.weighted_sum = self.window @ self.weights
+
+        return self.value
+
+    def extend(self, data):
+        for x in data:
+            self.update(x)
+        return self.value
+
+
+class StreamingHMA:
+    def __init__(self, n):
+        self.n = n
+        self.full = StreamingWMA(n)
+        self.half = StreamingWMA(n // 2)
+        self.hull = StreamingWMA(int(sqrt(n)))
+
+    @property
+    def ready(self):
+        return self.hull.ready
+
+    @property
+    def value(self):
+        return self.hull.value
+
+    def update(self, x):
+        self.full.update(x)
+        self.half.update(x)
+        if self.full.ready:
+            self.hull.update(2 * self.half.value - self.full.value)
+        return self.value
+
+    def extend(self, data):
+        for x in data:
+            self.update(x)
+        return self.value
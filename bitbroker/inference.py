@@ -0,0 +1,99 @@
+import asyncio
+
+import numpy as np
+
+# Columns of the preprocessed data that are not model inputs: the targets, which all come
+# from the next candle, and the predictions of a backtest.
+NON_FEATURE_COLUMNS = ('Date', 'y', '%y', 'log10y', 'booly', 'prediction')
+
+_predictors = {}
+
+
+def load_model(model_path):
+    import tensorflow as tf
+
+    return tf.keras.models.load_model(model_path)
+
+
+def get_predictor(model_path):
+    """One shared predictor per model, so brokers using it are batched together."""
+    if model_path not in _predictors:
+        _predictors[model_path] = Predictor(model_path)
+    return _predictors[model_path]
+
+
+def get_features(candle, columns=None):
+    """Model inputs of one candle, every column but the targets unless ``columns`` given."""
+    if columns is None:
+        columns = [column for column in candle.keys() if column not in NON_FEATURE_COLUMNS]
+    return np.array([candle[column] for column in columns], dtype=np.float32)
+
+
+def get_feature_matrix(frame, columns=None):
+    if columns is None:
+        columns = [column for column in frame.columns if column not in NON_FEATURE_COLUMNS]
+    return frame[columns].to_numpy(dtype=np.float32)
+
+
+class Predictor:
+    """Keras model predicting whole windows at once or micro-batching live requests.
+
+    The model, and with it TensorFlow, is loaded on first use. Live requests made through
+    ``predict_async`` within ``max_delay`` seconds of each other, up to ``max_batch`` of
+    them, share one ``model.predict`` call.
+    """
+
+    def __init__(self, model_path=None, model=None, max_batch=1024, max_delay=0.005):
+        self.model_path = model_path
+        self._model = model
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = []
+        self._timer = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = load_model(self.model_path)
+        return self._model
+
+    def predict(self, features):
+        features = np.asarray(features, dtype=np.float32)
+        if len(features) == 0:
+            return np.empty(0)
+        return np.asarray(self.model.predict(features, batch_size=self.max_batch)).reshape(
+            len(features)
+        )
+
+    async def predict_async(self, features):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._predict_batch(batch))
+
+    async def _predict_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        features = np.stack([features for features, _ in batch])
+        try:
+            predictions = await loop.run_in_executor(None, self.predict, features)
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+        else:
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
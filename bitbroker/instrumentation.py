@@ -0,0 +1,153 @@
+import json
+import time
+from bisect import bisect_left
+
+# Upper bounds, in seconds, of the latency histogram buckets: 1, 2.5 and 5 of every power
+# of ten from a microsecond to ten seconds.
+BUCKETS = tuple(float(f'{m}e{e}') for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)
+
+# Broker methods timed as the stages of a tick, see instrument.
+STAGES = {
+    'fetch': 'get_fresh_candle',
+    'indicators': '_append',
+    'desire': '_get_desire',
+    'act': '_act',
+    'tick': 'step',
+}
+
+COUNTERS = ['ticks', 'trades', 'indicator_seconds']
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+        return 0.0
+
+    def to_dict(self):
+        return {
+            'buckets': dict(zip(map(str, BUCKETS + ('+Inf',)), self.counts)),
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+
+class Instrumentation:
+    """Latency histograms of the stages of a broker's ticks and its counters."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.trades = 0
+
+    @property
+    def counters(self):
+        return {
+            'ticks': self.stages['tick'].count,
+            'trades': self.trades,
+            'indicator_seconds': self.stages['indicators'].sum,
+        }
+
+    def to_dict(self):
+        return {
+            'broker': self.name,
+            'counters': self.counters,
+            'stages': {stage: hist.to_dict() for stage, hist in self.stages.items()},
+        }
+
+    def summary_rows(self):
+        return [
+            [
+                self.name,
+                stage,
+                hist.count,
+                hist.mean * 1e6,
+                hist.quantile(0.5) * 1e6,
+                hist.quantile(0.99) * 1e6,
+                hist.sum,
+            ]
+            for stage, hist in self.stages.items()
+            if hist.count
+        ]
+
+
+SUMMARY_HEADERS = ['Broker', 'Stage', 'Calls', 'Mean [us]', 'p50 [us]', 'p99 [us]', 'Total [s]']
+
+
+def _timed(method, histogram):
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        result = method(*args, **kwargs)
+        histogram.observe(time.perf_counter() - start)
+        return result
+
+    return timed
+
+
+def instrument(broker, instrumentation=None):
+    """Time every stage of ``broker``'s ticks from now on.
+
+    The timed methods are set on the broker instance only, so brokers that are not
+    instrumented run the plain class methods without any overhead.
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation(type(broker).__name__)
+    for stage, name in STAGES.items():
+        method = getattr(broker, name)
+        if method is not None:
+            setattr(broker, name, _timed(method, instrumentation.stages[stage]))
+
+    act = broker._act
+
+    def counted_act(desire):
+        balance = broker.balance
+        act(desire)
+        if broker.balance != balance:
+            instrumentation.trades += 1
+
+    broker._act = counted_act
+    broker.instrumentation = instrumentation
+    return instrumentation
+
+
+def to_json(instrumentations):
+    return json.dumps([instrumentation.to_dict() for instrumentation in instrumentations])
+
+
+def to_prometheus(instrumentations):
+    """Prometheus text exposition of the histograms and counters."""
+    lines = ['# TYPE bitbroker_stage_seconds histogram']
+    lines += [f'# TYPE bitbroker_{counter}_total counter' for counter in COUNTERS]
+    for instrumentation in instrumentations:
+        broker = f'broker="{instrumentation.name}"'
+        for stage, hist in instrumentation.stages.items():
+            labels = f'{broker},stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), hist.counts):
+                cumulative += count
+                line = f'bitbroker_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                lines.append(line)
+            lines.append(f'bitbroker_stage_seconds_sum{{{labels}}} {hist.sum}')
+            lines.append(f'bitbroker_stage_seconds_count{{{labels}}} {hist.count}')
+        for counter, value in instrumentation.counters.items():
+            lines.append(f'bitbroker_{counter}_total{{{broker}}} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,64 @@
+from collections import deque
+
+from .brokers import Broker
+from .brokers import Desire
+from .brokers import TestBroker
+from .inference import get_feature_matrix
+from .inference import get_features
+from .inference import get_predictor
+
+
+class AbstractModelBroker(Broker):
+    def __init__(self, model_path, *args, predictor=None, feature_columns=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.predictor = get_predictor(model_path) if predictor is None else predictor
+        self.feature_columns = feature_columns
+        self.predictions = deque()
+
+    def predict_window(self, candles):
+        """Predict all upcoming candles of a backtest with one model call."""
+        features = get_feature_matrix(candles, self.feature_columns)
+        self.predictions.extend(self.predictor.predict(features))
+
+    async def prepare(self, candle):
+        features = get_features(candle, self.feature_columns)
+        self.predictions.append(await self.predictor.predict_async(features))
+
+    def _get_prediction(self, candle):
+        if self.predictions:
+            return self.predictions.popleft()
+        if 'prediction' in candle:
+            return candle['prediction']
+        return self.predictor.predict([get_features(candle, self.feature_columns)])[0]
+
+    def _get_close(self, candle):
+        return 10 ** candle['log10close']
+
+
+class AIBroker(AbstractModelBroker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.offset = 0.00
+
+    def _get_desire(self, candle):
+        prediction = self._get_prediction(candle)
+        if prediction > 0.5 + self.offset:
+            return Desire.buy
+        elif prediction < 0.5 - self.offset:
+            return Desire.sell
+        else:
+            return Desire.none
+
+
+class AIRegressionBroker(AbstractModelBroker):
+    def _get_desire(self, candle):
+        prediction = 10 ** self._get_prediction(candle)
+        return Desire.buy if prediction > self.available_data[-1] else Desire.sell
+
+
+class TestAIBroker(TestBroker, AIBroker):
+    pass
+
+
+class TestAIRegressionBroker(TestBroker, AIRegressionBroker):
+    pass
@@ -0,0 +1,113 @@
+import os
+
+import ephem
+import numpy as np
+import pandas as pd
+
+from .cache import CACHE_DIR
+
+
+# Dates in ephem are days since this instant.
+EPHEM_EPOCH = pd.Timestamp('1899-12-31 12:00')
+DAY = pd.Timedelta(days=1)
+
+
+def to_days(dates):
+    return np.asarray((pd.DatetimeIndex(dates) - EPHEM_EPOCH) / DAY, dtype=np.float64)
+
+
+def compute_year(year):
+    """New and full moon instants, in ephem days, of one calendar year."""
+    start, end = ephem.Date(f'{year}/1/1'), ephem.Date(f'{year + 1}/1/1')
+    moons = []
+    for next_moon in [ephem.next_new_moon, ephem.next_full_moon]:
+        instants = []
+        moon = next_moon(start)
+        while moon < end:
+            instants.append(float(moon))
+            moon = next_moon(moon)
+        moons.append(np.array(instants))
+    return moons
+
+
+class LunarPhases:
+    """Table of new and full moons answering ``is_waxing`` with a binary search.
+
+    The table is built from whole calendar years, each computed with ephem once and then
+    kept in ``cache_dir``. It grows as dates outside of it are asked for.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.years = {}
+        self.new_moons = self.full_moons = np.empty(0)
+        # Covered span, in ephem days; the first year only provides the moons before it.
+        self.first = self.last = None
+
+    def _path(self, year):
+        return os.path.join(self.cache_dir, f'moon-phases-{year}.npz')
+
+    def _load_year(self, year):
+        path = self._path(year)
+        if os.path.isfile(path):
+            with np.load(path) as cached:
+                return cached['new_moons'], cached['full_moons']
+
+        new_moons, full_moons = compute_year(year)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, new_moons=new_moons, full_moons=full_moons)
+        os.replace(tmp_path, path)
+        return new_moons, full_moons
+
+    def cover(self, first_year, last_year):
+        if self.years:
+            # Keep the table contiguous, so that no year in the middle lacks its moons.
+            first_year = min(first_year, min(self.years) + 1)
+            last_year = max(last_year, max(self.years))
+        years = range(first_year - 1, last_year + 1)
+        if all(year in self.years for year in years):
+            return
+
+        for year in years:
+            if year not in self.years:
+                self.years[year] = self._load_year(year)
+
+        self.new_moons = np.concatenate([self.years[y][0] for y in years])
+        self.full_moons = np.concatenate([self.years[y][1] for y in years])
+        self.first = float(ephem.Date(f'{years[0] + 1}/1/1'))
+        self.last = float(ephem.Date(f'{years[-1] + 1}/1/1'))
+
+    def waxing(self, dates):
+        """Vectorized ``is_waxing`` over a whole Date column."""
+        dates = pd.DatetimeIndex(dates)
+        if len(dates) == 0:
+            return np.empty(0, dtype=bool)
+        self.cover(dates.min().year, dates.max().year)
+        return self._waxing(to_days(dates))
+
+    def is_waxing(self, date):
+        date = pd.Timestamp(date)
+        day = (date - EPHEM_EPOCH) / DAY
+        if self.first is None or not self.first <= day < self.last:
+            self.cover(date.year, date.year)
+        return bool(self._waxing(day))
+
+    def _waxing(self, days):
+        # The moons strictly before each date, like ephem.previous_*_moon.
+        previous_new = self.new_moons[np.searchsorted(self.new_moons, days) - 1]
+        previous_full = self.full_moons[np.searchsorted(self.full_moons, days) - 1]
+        return previous_full < previous_new
+
+
+_phases = LunarPhases()
+
+
+def waxing(dates):
+    return _phases.waxing(dates)
+
+
+def is_waxing(date):
+    """Whether the moon is between a new moon and the following full moon at ``date``."""
+    return _phases.is_waxing(date)
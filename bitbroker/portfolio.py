@@ -0,0 +1,180 @@
+import argparse
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+from .brokers import Balance
+from .brokers import MoonBroker
+from .brokers import NoLossBroker
+from .brokers import ReversedMoonBroker
+from .candles import read_candles
+from .positions import BUY
+from .positions import NONE
+from .positions import run_policy
+from .positions import SELL
+from .registry import BROKERS
+from .registry import get_broker
+from .vectorized import get_desires
+from .vectorized import HullCache
+
+Portfolio = namedtuple('Portfolio', 'capital equity total trades holding')
+
+
+def product_name(path):
+    # get_historic_data saves data.{product}.{startdate}.GRAN{granularity}.{extension}
+    name = os.path.basename(path.rstrip(os.sep))
+    return name.split('.')[1] if name.startswith('data.') else name.split('.')[0]
+
+
+def load_closes(paths, start=None, end=None):
+    """Closes of the products in ``paths`` as one (dates × products) frame.
+
+    The frame starts at the first date every product has a candle for, and a product
+    missing a later candle keeps its previous close.
+    """
+    closes = {
+        product_name(path): read_candles(path, start, end, columns=['Close'])['Close']
+        for path in paths
+    }
+    closes = pd.DataFrame(closes).sort_index().ffill()
+    return closes.iloc[closes.notna().all(axis=1).to_numpy().argmax() :]
+
+
+class HullMatrix:
+    """Hull series of every column of a (ticks × products) price matrix.
+
+    Stands in for a ``HullCache`` in the desire functions of ``vectorized``, which then
+    return a desire per tick and product.
+    """
+
+    def __init__(self, prices):
+        self.prices = np.asarray(prices, dtype=float)
+        self.columns = [HullCache(column) for column in self.prices.T]
+
+    def ticks(self, n, warmup):
+        return np.column_stack([hulls.ticks(n, warmup) for hulls in self.columns])
+
+
+def portfolio_desires(broker_cls, closes, period, warmup):
+    """Desires of ``broker_cls`` for every tick after ``warmup`` and every product."""
+    if issubclass(broker_cls, MoonBroker):
+        from .moon import waxing
+
+        buy = waxing(closes.index[warmup:])
+        if issubclass(broker_cls, ReversedMoonBroker):
+            buy = ~buy
+        desires = np.where(buy, BUY, SELL)
+        return np.repeat(desires[:, None], closes.shape[1], axis=1)
+
+    prices = closes.to_numpy(dtype=float)
+    return get_desires(broker_cls, prices, period, warmup, HullMatrix(prices))
+
+
+def holdings(desires):
+    """Whether each product is held after every tick, desires being (ticks × products)."""
+    ticks = np.arange(len(desires))[:, None]
+    last_signal = np.maximum.accumulate(np.where(desires != NONE, ticks, -1), axis=0)
+    held = np.take_along_axis(desires, np.maximum(last_signal, 0), axis=0) == BUY
+    return held & (last_signal >= 0)
+
+
+def allocation(products, weights=None):
+    """Shares of the capital given to the products, equal unless ``weights`` says."""
+    weights = np.ones(len(products)) if weights is None else np.asarray(weights, dtype=float)
+    if len(weights) != len(products) or (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError(f'Invalid weights for {len(products)} products: {weights}')
+    return weights / weights.sum()
+
+
+def backtest_portfolio(closes, broker_cls, period, fee=0, weights=None, capital=1000, warmup=None):
+    """Run ``broker_cls`` on every product of ``closes`` at once.
+
+    Every product trades its share of ``capital`` on its own, as one broker would, from
+    the first ``warmup`` closes on. Returns the capital of every product, their USD value
+    and that of the whole portfolio after each tick, the trades of every product and
+    whether it is held at the end.
+    """
+    warmup = period * 2 if warmup is None else warmup
+    prices = closes.to_numpy(dtype=float)
+    desires = portfolio_desires(broker_cls, closes, period, warmup)
+
+    if issubclass(broker_cls, NoLossBroker):
+        # Whether a sale happens depends on the price of the last one, product by product.
+        executed = np.full(desires.shape, NONE)
+        for j in range(desires.shape[1]):
+            ticks, _ = run_policy(desires[:, j], prices[warmup:, j], fee, Balance(1, 0), True)
+            executed[ticks, j] = desires[ticks, j]
+        desires = executed
+
+    held = holdings(desires)
+    held_before = np.vstack((np.zeros((1, held.shape[1]), dtype=bool), held[:-1]))
+    traded = held != held_before
+
+    # A tick moves the value with the price while the product is held, then pays the fee
+    # on what is traded. Nothing is held before the first tick.
+    growth = np.where(held_before, (prices / np.roll(prices, 1, axis=0))[warmup:], 1.0)
+    growth *= np.where(traded, 1 - fee, 1.0)
+    shares = pd.Series(allocation(closes.columns, weights) * capital, index=closes.columns)
+    equity = pd.DataFrame(
+        shares.to_numpy() * np.cumprod(growth, axis=0),
+        index=closes.index[warmup:],
+        columns=closes.columns,
+    )
+
+    trades = pd.Series(traded.sum(axis=0), index=closes.columns)
+    holding = pd.Series(held[-1], index=closes.columns)
+    return Portfolio(shares, equity, equity.sum(axis=1), trades, holding)
+
+
+def summary(portfolio):
+    """Rows of the final value, return, maximum drawdown and trades of every product."""
+    equity = pd.concat([portfolio.equity, portfolio.total.rename('TOTAL')], axis=1)
+    capital, trades = (
+        pd.concat([column, pd.Series({'TOTAL': column.sum()})])
+        for column in [portfolio.capital, portfolio.trades]
+    )
+    drawdown = (equity / equity.cummax() - 1).min()
+    returns = (equity.iloc[-1] / capital - 1) * 100
+    return [
+        [
+            product,
+            equity[product].iloc[-1],
+            returns[product],
+            drawdown[product] * 100,
+            trades[product],
+        ]
+        for product in equity.columns
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Run a trading strategy on many products at once.'
+    )
+    parser.add_argument('--data', nargs='+', required=True, help='Data files, one per product.')
+    parser.add_argument('--start', default='20190101', help='First date of the data to use.')
+    parser.add_argument('--fee', default=0, type=float, help='Trading fee for bot.')
+    parser.add_argument(
+        '--broker', default='TestSimpleHullBroker', choices=sorted(BROKERS), help='Broker to test.'
+    )
+    parser.add_argument('--period', default=20, type=int, help='Hull period of the broker.')
+    parser.add_argument(
+        '--weights', nargs='+', type=float, help='Capital weights, one per product.'
+    )
+    parser.add_argument('--capital', default=1000, type=float, help='USD to start with.')
+    args = parser.parse_args()
+
+    closes = load_closes(args.data, args.start)
+    portfolio = backtest_portfolio(
+        closes, get_broker(args.broker), args.period, args.fee, args.weights, args.capital
+    )
+    print(
+        tabulate(
+            summary(portfolio),
+            headers=['Product', 'Equity', 'Return [%]', 'Max Drawdown [%]', 'Trades'],
+            floatfmt=',.2f',
+        )
+    )
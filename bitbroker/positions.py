@@ -0,0 +1,78 @@
+import numpy as np
+
+from .brokers import Balance
+from .brokers import Desire
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+BUY = Desire.buy.value
+SELL = Desire.sell.value
+NONE = Desire.none.value
+
+
+def _trades(desires, prices, signals, fees, usd, btc, no_loss):
+    # Mirrors Broker._act and NoLossBroker._act, operation for operation, on the ticks with
+    # a buy or sell desire. The last USD balance only changes with a sale, so it is kept
+    # in a variable instead of being searched for in the history. Every fee gets a pass of
+    # its own, the trades of the no-loss policy depend on it.
+    counts = np.zeros(len(fees), dtype=np.int64)
+    ticks = np.empty((len(fees), len(signals)), dtype=np.int64)
+    balances = np.empty((len(fees), len(signals), 2))
+    for j in range(len(fees)):
+        fee = fees[j]
+        fee_usd, fee_btc = usd, btc
+        last_usd = fee_usd if fee_usd > 0 else np.nan
+        count = 0
+        for i in signals:
+            desire = desires[i]
+            traded = False
+            if fee_usd == 0 and fee_btc > 0:
+                if desire == SELL:
+                    sold = fee_btc * prices[i] * (1 - fee) + fee_usd
+                    if not no_loss or sold > last_usd:
+                        fee_usd, fee_btc, last_usd = sold, 0.0, sold
+                        traded = True
+            elif desire == BUY:
+                fee_usd, fee_btc = 0.0, fee_usd / prices[i] * (1 - fee) + fee_btc
+                traded = True
+            if traded:
+                ticks[j, count] = i
+                balances[j, count, 0] = fee_usd
+                balances[j, count, 1] = fee_btc
+                count += 1
+        counts[j] = count
+    return counts, ticks, balances
+
+
+_compiled_trades = None if njit is None else njit(cache=True)(_trades)
+
+
+def run_policies(desires, prices, fees, balance=Balance(1000, 0), no_loss=False):
+    """``run_policy`` for every fee of ``fees`` in one call.
+
+    Returns the number of trades of every fee and, one row per fee, the ticks of the
+    trades and the ``(USD, BTC)`` balance after each one. Rows are only filled up to the
+    number of trades of their fee.
+    """
+    desires = np.asarray(desires, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    fees = np.asarray(fees, dtype=np.float64)
+    signals = np.flatnonzero(desires != NONE)
+    usd, btc = float(balance.USD), float(balance.BTC)
+
+    trades = _trades if _compiled_trades is None else _compiled_trades
+    return trades(desires, prices, signals, fees, usd, btc, no_loss)
+
+
+def run_policy(desires, prices, fee, balance=Balance(1000, 0), no_loss=False):
+    """Trades of a broker acting on ``desires`` at ``prices``, one of each per tick.
+
+    With ``no_loss`` a position is only sold for more USD than it was bought with, like
+    ``NoLossBroker`` does. Returns the ticks of the trades and the balance after each one.
+    The loop is compiled when numba is installed.
+    """
+    (count,), (ticks,), (balances,) = run_policies(desires, prices, [fee], balance, no_loss)
+    return ticks[:count].tolist(), [Balance(*balance) for balance in balances[:count].tolist()]
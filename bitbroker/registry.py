@@ -0,0 +1,26 @@
+from importlib import import_module
+
+# Module of every broker class that can be looked up by name. Nothing is imported until a
+# broker is asked for, so heavy dependencies stay out of processes that never use them:
+# the brokers running a model, and with it TensorFlow, live in a module of their own.
+BROKERS = {
+    'TestAIBroker': 'bitbroker.model_brokers',
+    'TestAIRegressionBroker': 'bitbroker.model_brokers',
+    'TestCrossoverHullBroker': 'bitbroker.brokers',
+    'TestHoldlBroker': 'bitbroker.brokers',
+    'TestJozefHullBroker': 'bitbroker.brokers',
+    'TestMoonBroker': 'bitbroker.brokers',
+    'TestNoLossCrossoverHullBroker': 'bitbroker.brokers',
+    'TestReversedMoonBroker': 'bitbroker.brokers',
+    'TestSimpleHullBroker': 'bitbroker.brokers',
+}
+
+
+def register(name, module):
+    BROKERS[name] = module
+
+
+def get_broker(name):
+    if name not in BROKERS:
+        raise ValueError(f'Unknown broker {name}, choose from {", ".join(sorted(BROKERS))}')
+    return getattr(import_module(BROKERS[name]), name)
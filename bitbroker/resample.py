@@ -0,0 +1,168 @@
+import argparse
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .candles import CandleStore
+from .candles import EXTENSION
+from .candles import is_candle_store
+from .candles import read_candles
+
+# Granularities, in seconds, that Coinbase serves candles in.
+GRANULARITIES = [60, 300, 900, 3600, 86400]
+
+# How the candles of a coarser one are made, for the columns the base candles have.
+FIRST, LAST = 'first', 'last'
+AGGREGATIONS = {
+    'Open': FIRST,
+    'High': np.maximum,
+    'Low': np.minimum,
+    'Close': LAST,
+    'Volume': np.add,
+}
+
+
+def aggregate(arrays, seconds):
+    """Candles of ``seconds`` from the columns ``arrays`` of finer, sorted candles.
+
+    A candle covers the ``seconds`` from a multiple of ``seconds`` since the epoch and is
+    dated by its start, like the candles of Coinbase. Missing candles leave no gap.
+    """
+    dates = np.asarray(arrays['Date'], dtype='datetime64[ns]')
+    buckets = dates.view(np.int64) // (seconds * 10 ** 9)
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[:1] - 1))
+    ends = np.append(starts[1:], len(dates))[: len(starts)] - 1
+
+    candles = {'Date': (buckets[starts] * seconds * 10 ** 9).astype('datetime64[ns]')}
+    for column, how in AGGREGATIONS.items():
+        if column in arrays:
+            values = np.asarray(arrays[column])
+            if how is FIRST:
+                candles[column] = values[starts]
+            elif how is LAST:
+                candles[column] = values[ends]
+            else:
+                candles[column] = how.reduceat(values, starts) if len(values) else values
+    return candles
+
+
+def _frame(candles):
+    return pd.DataFrame(candles, index=pd.DatetimeIndex(candles['Date'], name='Date'))
+
+
+def base_seconds(dates):
+    """Granularity of candles dated ``dates``, the most common step between them."""
+    steps = np.diff(np.asarray(dates[:1000], dtype='datetime64[s]').view(np.int64))
+    values, counts = np.unique(steps, return_counts=True)
+    return int(values[counts.argmax()]) if len(values) else 0
+
+
+def pyramid_path(path):
+    return path.rstrip(os.sep) + '.pyramid'
+
+
+class Pyramid:
+    """Coarser candles of a base data file, kept in candle stores next to it.
+
+    Each level stores its complete candles and how many base candles they were made of.
+    ``update`` only aggregates the base candles added since, and the candle still being
+    formed is aggregated from the last few base candles when a level is read.
+    """
+
+    def __init__(self, path, granularities=None):
+        self.path = path
+        self.directory = pyramid_path(path)
+        if granularities is None:
+            step = base_seconds(self._base()['Date'])
+            granularities = [seconds for seconds in GRANULARITIES if seconds > step]
+        self.granularities = list(granularities)
+
+    def level_path(self, seconds):
+        return os.path.join(self.directory, f'GRAN{seconds}{EXTENSION}')
+
+    def _base(self, first=0):
+        """Columns of the base candles from row ``first`` on."""
+        if is_candle_store(self.path):
+            store = CandleStore(self.path)
+            columns = [c for c in store.columns if c == 'Date' or c in AGGREGATIONS]
+            return {column: store.column(column)[first:] for column in columns}
+
+        # get_historic_data pickles candles newest first.
+        frame = read_candles(self.path).sort_index().iloc[first:]
+        arrays = {'Date': frame.index.to_numpy()}
+        arrays.update({c: frame[c].to_numpy() for c in AGGREGATIONS if c in frame})
+        return arrays
+
+    def _level(self, seconds):
+        path = self.level_path(seconds)
+        return CandleStore(path) if is_candle_store(path) else None
+
+    def update(self):
+        """Bring every level up to date with the base candles."""
+        levels = {seconds: self._level(seconds) for seconds in self.granularities}
+        # A base shorter than what a level was made of was rewritten, make that level anew.
+        length = len(self._base()['Date'])
+        for seconds, store in levels.items():
+            if store is not None and store.attrs['base_rows'] > length:
+                shutil.rmtree(store.path)
+                levels[seconds] = None
+
+        first = min(0 if s is None else s.attrs['base_rows'] for s in levels.values())
+        base = self._base(first)
+        for seconds, store in levels.items():
+            done = 0 if store is None else store.attrs['base_rows'] - first
+            candles = aggregate({c: values[done:] for c, values in base.items()}, seconds)
+            # The last candle may still get base candles, it is only stored once complete.
+            complete = len(candles['Date']) - 1
+            if complete <= 0:
+                continue
+            rows = int(np.searchsorted(base['Date'][done:], candles['Date'][-1]))
+            frame = _frame({c: values[:complete] for c, values in candles.items()})
+            attrs = {'seconds': seconds, 'base_rows': first + done + rows}
+            if store is None:
+                os.makedirs(self.directory, exist_ok=True)
+                CandleStore.create(self.level_path(seconds), frame, attrs)
+            else:
+                store.append(frame, attrs)
+
+    def _read(self, seconds, start, end):
+        if seconds not in self.granularities:
+            raise ValueError(f'No {seconds} s candles, only {self.granularities}')
+        store = self._level(seconds)
+        if store is None:
+            return _frame(aggregate(self._base(), seconds)).loc[start:end]
+
+        pending = _frame(aggregate(self._base(store.attrs['base_rows']), seconds))
+        return pd.concat([store.to_frame(start, end), pending.loc[start:end, store.columns]])
+
+    def timeframe(self, seconds, start=None, end=None):
+        """Candles of ``seconds`` between ``start`` and ``end``, the last one included."""
+        self.update()
+        return self._read(seconds, start, end)
+
+    def timeframes(self, granularities, start=None, end=None):
+        """``timeframe`` of all ``granularities``, by granularity."""
+        self.update()
+        return {seconds: self._read(seconds, start, end) for seconds in granularities}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Build or update the coarser candles of a data file.'
+    )
+    parser.add_argument('--data', type=str, required=True, help='Path to the data file.')
+    parser.add_argument(
+        '--granularities',
+        nargs='+',
+        type=int,
+        help='Granularities in seconds, all the coarser ones of Coinbase by default.',
+    )
+    args = parser.parse_args()
+
+    pyramid = Pyramid(args.data, args.granularities)
+    pyramid.update()
+    for seconds in pyramid.granularities:
+        store = pyramid._level(seconds)
+        print(f'GRAN{seconds}: {0 if store is None else len(store)} candles')
@@ -0,0 +1,199 @@
+import argparse
+import multiprocessing as mp
+import tempfile
+
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+from . import run_parallel_simulation as parallel
+from .portfolio import backtest_portfolio
+from .registry import BROKERS
+from .registry import get_broker
+from .run_simulation import load_data
+
+BLOCK = 96  # a day of 15 minute candles
+REGIME = 96 * 30
+CHUNK_SIZE = 64
+METRICS = ['balance', 'drawdown', 'order_frequency']
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+
+def _log_returns(close):
+    return np.diff(np.log(np.asarray(close, dtype=float)))
+
+
+def _paths(first, returns):
+    """Price paths starting at ``first`` and moving by the log ``returns`` of each row."""
+    steps = np.concatenate((np.zeros((len(returns), 1)), returns), axis=1)
+    return first * np.exp(np.cumsum(steps, axis=1))
+
+
+def block_bootstrap(close, k, rng, block=BLOCK, regime=REGIME):
+    """``k`` paths of the returns of ``close`` resampled in blocks of ``block`` candles.
+
+    Blocks keep the volatility clustering within them.
+    """
+    returns = _log_returns(close)
+    block = min(block, len(returns))
+    blocks = -(-len(returns) // block)
+    starts = rng.integers(0, len(returns) - block + 1, (k, blocks))
+    rows = (starts[:, :, None] + np.arange(block)).reshape(k, -1)[:, : len(returns)]
+    return _paths(close[0], returns[rows])
+
+
+def gbm(close, k, rng, block=BLOCK, regime=REGIME):
+    """``k`` geometric Brownian motions with the drift and volatility of ``close``."""
+    returns = _log_returns(close)
+    steps = rng.normal(returns.mean(), returns.std(), (k, len(returns)))
+    return _paths(close[0], steps)
+
+
+def regime_shuffle(close, k, rng, block=BLOCK, regime=REGIME):
+    """``k`` paths of the periods of ``regime`` candles of ``close`` in random orders.
+
+    Every path ends at the last close, through the same regimes in another order.
+    """
+    returns = _log_returns(close)
+    periods = -(-len(returns) // regime)
+    padded = np.full(periods * regime, np.nan)
+    padded[: len(returns)] = returns
+
+    order = np.argsort(rng.random((k, periods)), axis=1)
+    shuffled = padded.reshape(periods, regime)[order].reshape(k, -1)
+    # Only the last period is shorter, so every path has the same padding to drop.
+    shuffled = shuffled[~np.isnan(shuffled)].reshape(k, len(returns))
+    return _paths(close[0], shuffled)
+
+
+GENERATORS = {
+    'bootstrap': block_bootstrap,
+    'gbm': gbm,
+    'regimes': regime_shuffle,
+}
+
+
+def evaluate_paths(paths, dates, broker_cls, period, fee):
+    """Final balance, maximum drawdown and order frequency of a broker on every path.
+
+    The paths are the columns of one ``backtest_portfolio`` with 1000 USD each. The
+    balance is after selling at the end, like a simulation reports it.
+    """
+    closes = pd.DataFrame(np.asarray(paths).T, index=dates)
+    portfolio = backtest_portfolio(closes, broker_cls, period, fee, capital=1000 * len(paths))
+
+    equity = portfolio.equity.to_numpy()
+    balance = equity[-1] * np.where(portfolio.holding, 1 - fee, 1)
+    drawdown = (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0)
+    # As get_order_frequency counts it: the distinct USD and BTC amounts of the balances,
+    # the initial ones and the zero left by every trade included.
+    trades = portfolio.trades.to_numpy()
+    order_frequency = (trades + 1 + (trades > 0)) / (len(equity) + 1) * 100
+    return balance, drawdown, order_frequency
+
+
+def parallel_helper_paths(over):
+    generator, seed, k, broker_cls, period, fee, params = over
+    close = parallel.shared_data['Close'].to_numpy()
+    paths = GENERATORS[generator](close, k, np.random.default_rng(seed), **params)
+    return evaluate_paths(paths, parallel.shared_data.index, broker_cls, period, fee)
+
+
+def robustness(
+    raw_data,
+    broker_cls,
+    period,
+    fee,
+    generators=tuple(GENERATORS),
+    paths=1000,
+    seed=0,
+    chunk_size=CHUNK_SIZE,
+    processes=None,
+    **params,
+):
+    """Results of ``broker_cls`` on ``paths`` synthetic paths of every generator.
+
+    The paths are generated and run in chunks of ``chunk_size`` in a process pool. Every
+    chunk has a seed of its own derived from ``seed``, so the results do not depend on the
+    number of processes. Returns one row per path.
+    """
+    sizes = [min(chunk_size, paths - start) for start in range(0, paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(generators))
+    tasks = [
+        (generator, chunk_seed, size, broker_cls, period, fee, params)
+        for generator, generator_seed in zip(generators, seeds)
+        for chunk_seed, size in zip(generator_seed.spawn(len(sizes)), sizes)
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        parallel.share_data(raw_data, directory)
+        initargs = (directory,)
+        with mp.Pool(processes, initializer=parallel.load_shared_data, initargs=initargs) as pool:
+            results = pool.map(parallel_helper_paths, tasks)
+
+    frames = [
+        pd.DataFrame(dict(zip(METRICS, result))).assign(generator=task[0])
+        for task, result in zip(tasks, results)
+    ]
+    results = pd.concat(frames, ignore_index=True)
+    results['path'] = results.groupby('generator').cumcount()
+    return results[['generator', 'path'] + METRICS]
+
+
+def summary(results):
+    """Mean and quantiles of every metric, for every generator."""
+    rows = []
+    for generator, group in results.groupby('generator', sort=False):
+        for metric in METRICS:
+            values = group[metric]
+            rows.append([generator, metric, values.mean(), *values.quantile(QUANTILES)])
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Run a strategy on synthetic price paths resampled from the data.'
+    )
+    parser.add_argument('--data', type=str, required=True, help='Path to the data file.')
+    parser.add_argument('--fee', default=0, type=float, help='Trading fee for bot.')
+    parser.add_argument(
+        '--broker', default='TestSimpleHullBroker', choices=sorted(BROKERS), help='Broker to test.'
+    )
+    parser.add_argument('--period', default=20, type=int, help='Hull period of the broker.')
+    parser.add_argument(
+        '--generators',
+        nargs='+',
+        default=list(GENERATORS),
+        choices=list(GENERATORS),
+        help='Kinds of paths.',
+    )
+    parser.add_argument('--paths', default=1000, type=int, help='Paths of every kind.')
+    parser.add_argument('--seed', default=0, type=int, help='Seed of the paths.')
+    parser.add_argument('--block', default=BLOCK, type=int, help='Bootstrap block length.')
+    parser.add_argument('--regime', default=REGIME, type=int, help='Shuffled regime length.')
+    args = parser.parse_args()
+
+    raw_data = load_data(args.data)
+    broker_cls = get_broker(args.broker)
+
+    results = robustness(
+        raw_data,
+        broker_cls,
+        args.period,
+        args.fee,
+        args.generators,
+        args.paths,
+        args.seed,
+        block=args.block,
+        regime=args.regime,
+    )
+    close = raw_data['Close'].to_numpy()
+    historical = evaluate_paths([close], raw_data.index, broker_cls, args.period, args.fee)
+    rows = [['historical', metric, value[0]] for metric, value in zip(METRICS, historical)]
+    print(
+        tabulate(
+            summary(results) + rows,
+            headers=['Paths', 'Metric', 'Mean'] + [f'{q:.0%}' for q in QUANTILES],
+            floatfmt=',.2f',
+        )
+    )
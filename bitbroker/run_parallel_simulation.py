@@ -1,31 +1,60 @@
 import argparse
 import multiprocessing as mp
+import os
+import tempfile
+from itertools import chain
 
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
-from . import brokers
+from .candles import tagged_path
+from .candles import write_candles
+from .equity import get_usd_values
+from .registry import BROKERS
+from .registry import get_broker
 from .run_simulation import load_data
 from .run_simulation import simulate
+from .sweep import grid
+from .sweep import sweep_values
+from .vectorized import is_vectorized
 
+SHARED_COLUMNS = ['Date', 'Close']
 
-def get_usd_series(broker, index, raw_data):
-    data = []
-    for balance, ts in zip(broker.history[1:], index):
+# Read-only candles of a worker process, see load_shared_data.
+shared_data = None
 
-        USD = balance.USD if balance.USD > 0 else balance.BTC * raw_data.loc[ts].Close
-        data.append(USD)
 
-    return pd.Series(data=data, index=index)
+def share_data(raw_data, directory):
+    for column in SHARED_COLUMNS:
+        np.save(os.path.join(directory, f'{column}.npy'), raw_data[column].values)
+
+
+def load_shared_data(directory):
+    global shared_data
+    columns = {
+        column: np.load(os.path.join(directory, f'{column}.npy'), mmap_mode='r')
+        for column in SHARED_COLUMNS
+    }
+    shared_data = pd.DataFrame(columns, index=pd.DatetimeIndex(columns['Date']), copy=False)
+
+
+def result_name(broker_cls, fee, period):
+    return f'{broker_cls.__name__}_{fee:.4f}_{period}'
 
 
 def parallel_helper_simulation(over):
-    data_path, broker_cls, fee, period = over
-    raw_data = load_data(data_path)
-    finished_broker, index = simulate(raw_data, broker_cls, period, fee, return_index=True)
-    return f'{broker_cls.__name__}_{fee:.4f}_{period}', get_usd_series(
-        finished_broker, index, raw_data
-    )
+    broker_cls, fee, period = over
+    finished_broker = simulate(shared_data, broker_cls, period, fee)
+    close = shared_data['Close'].values[period * 2 + 1 :]
+    return result_name(broker_cls, fee, period), get_usd_values(finished_broker, close)
+
+
+def parallel_helper_sweep(combinations):
+    """``parallel_helper_simulation`` of all the ``combinations`` in one sweep."""
+    swept = [(broker_cls, period, fee) for broker_cls, fee, period in combinations]
+    values = sweep_values(shared_data['Close'].values, swept)
+    return [(result_name(*over), usd) for over, usd in zip(combinations, values)]
 
 
 if __name__ == "__main__":
@@ -33,25 +62,41 @@ if __name__ == "__main__":
         description='Simulate trading strategies on the provided data.'
     )
     parser.add_argument('--data', type=str, required=True, help='Path to the data file.')
+    parser.add_argument(
+        '--brokers',
+        nargs='+',
+        default=['TestMoonBroker', 'TestReversedMoonBroker'],  # ['TestSimpleHullBroker']
+        choices=sorted(BROKERS),
+        help='Brokers to test.',
+    )
     args = parser.parse_args()
 
     raw_data = load_data(args.data)
 
-    args_override = [
-        (args.data, broker, fee, period)
-        for broker in [
-            brokers.TestMoonBroker,
-            brokers.TestReversedMoonBroker,
-        ]  # [brokers.TestSimpleHullBroker]
-        for fee in [0, 0.001]
-        for period in [0]  # range(2, 200, 3)
-    ] + [(args.data, brokers.TestHoldlBroker, 0, 0)]
-
-    with mp.Pool() as pool:
-        for name, series in tqdm(
-            pool.imap(parallel_helper_simulation, args_override), total=len(args_override)
-        ):
-            raw_data[name] = series
-            print(name, series.iloc[-1])
-
-    raw_data.to_pickle(args.data.replace('pkl.xz', 'simple.pkl.xz'))
+    combinations = grid(
+        [get_broker(name) for name in args.brokers],
+        [0],  # range(2, 200, 3)
+        [0, 0.001],
+    ) + grid([get_broker('TestHoldlBroker')], [0], [0])
+    args_override = [(broker, fee, period) for broker, period, fee in combinations]
+    # The brokers with a vectorized implementation run in one sweep sharing their Hull
+    # series, the others are simulated candle by candle.
+    swept = [over for over in args_override if is_vectorized(over[0])]
+    simulated = [over for over in args_override if not is_vectorized(over[0])]
+
+    processes = os.cpu_count()
+    chunksize = max(1, len(simulated) // (processes * 4))
+
+    with tempfile.TemporaryDirectory() as directory:
+        share_data(raw_data, directory)
+
+        with mp.Pool(processes, initializer=load_shared_data, initargs=(directory,)) as pool:
+            sweep_results = pool.apply_async(parallel_helper_sweep, (swept,))
+            results = pool.imap(parallel_helper_simulation, simulated, chunksize)
+            results = chain(sweep_results.get(), results)
+            for name, values in tqdm(results, total=len(args_override)):
+                index = raw_data.index[len(raw_data) - len(values) :]
+                raw_data[name] = pd.Series(values, index=index)
+                print(name, values[-1])
+
+    write_candles(raw_data, tagged_path(args.data, 'simple'))
@@ -1,30 +1,58 @@
 import argparse
 
 import numpy as np
-import pandas as pd
 from tabulate import tabulate
 from tqdm import trange
 
-from . import brokers
-
-
-def load_data(path):
-    data = pd.read_pickle(path)
-    data = data.loc["20190101":]
+from . import vectorized
+from .cache import FeatureCache
+from .candles import read_candles
+from .instrumentation import SUMMARY_HEADERS
+from .instrumentation import to_json
+from .instrumentation import to_prometheus
+from .registry import BROKERS
+from .registry import get_broker
+from .resample import Pyramid
+from .sweep import sweep
+
+
+def load_data(path, start="20190101", granularity=None):
+    if granularity is None:
+        data = read_candles(path, start=start)
+    else:
+        data = Pyramid(path).timeframe(granularity, start)
     data = data[(100000 > data['Close']) & (data['Close'] > 100)]
     return data
 
 
-def simulate(raw_data, broker_cls, period, fee, return_index=False):
+def simulate(
+    raw_data,
+    broker_cls,
+    period,
+    fee,
+    return_index=False,
+    mode='event',
+    cache=None,
+    instrument=False,
+):
     d = raw_data['Close']
 
     start_idx = period * 2 + 1
 
+    if mode == 'vectorized':
+        hulls = vectorized.SkipHullCache(vectorized.HullCache(d, cache), period * 2)
+        broker = vectorized.backtest(broker_cls, hulls.prices, period, fee, hulls=hulls)
+        return (broker, raw_data.Date[start_idx:]) if return_index else broker
+    elif mode != 'event':
+        raise ValueError(f'Unknown simulation mode: {mode}')
+
     def data_feeder():
         for i in trange(start_idx, len(d)):
             yield raw_data.iloc[i]  # d[i]
 
     broker = broker_cls(period, d.tolist()[: period * 2], data_feeder().__next__, fee)
+    if instrument:
+        broker.instrument()
 
     try:
         broker.run()
@@ -37,7 +65,7 @@ def simulate(raw_data, broker_cls, period, fee, return_index=False):
 
 
 def get_order_frequency(broker):
-    return len(np.unique(broker.history)) / len(broker.history) * 100
+    return len(np.unique(broker.history.events())) / len(broker.history) * 100
 
 
 def parallel_helper_simulation(args):
@@ -51,17 +79,48 @@ if __name__ == "__main__":
     )
     parser.add_argument('--data', type=str, required=True, help='Path to the data file.')
     parser.add_argument('--fee', default=0, type=float, help='Trading fee for bot.')
+    parser.add_argument(
+        '--broker', default='TestSimpleHullBroker', choices=sorted(BROKERS), help='Broker to test.'
+    )
+    parser.add_argument(
+        '--mode',
+        default='sweep',
+        choices=['sweep', 'vectorized', 'event'],
+        help='Run all periods in one sweep, or each one as whole-series array operations or '
+        'candle by candle.',
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true', help='Do not read or store Hull series on disk.'
+    )
+    parser.add_argument(
+        '--granularity', type=int, help='Resample the data to candles of these seconds first.'
+    )
+    parser.add_argument(
+        '--profile',
+        type=int,
+        metavar='PERIOD',
+        help='Also run the broker event by event with this period and time its ticks.',
+    )
+    parser.add_argument(
+        '--metrics', help='Write the --profile metrics to this file, Prometheus text if *.prom.'
+    )
     args = parser.parse_args()
 
-    raw_data = load_data(args.data)
-
-    table = []
-    for period in range(2, 150, 3):
-        broker = simulate(raw_data, brokers.TestSimpleHullBroker, period, args.fee)
-        USD_balance = broker.balance.USD
-        table.append([period, USD_balance, get_order_frequency(broker)])
-        print(table[-1])
-    BASELINE = raw_data['Close'][-1] / raw_data['Close'][4] * 1000
+    raw_data = load_data(args.data, granularity=args.granularity)
+
+    cache = None if args.no_cache else FeatureCache()
+    broker_cls = get_broker(args.broker)
+    periods = range(2, 150, 3)
+    if args.mode == 'sweep':
+        results = sweep(raw_data['Close'], [broker_cls], periods, [args.fee], cache)
+        table = results[['period', 'balance', 'order_frequency']].itertuples(False)
+        table = list(map(list, table))
+    else:
+        table = []
+        for period in periods:
+            broker = simulate(raw_data, broker_cls, period, args.fee, mode=args.mode, cache=cache)
+            table.append([period, broker.balance.USD, get_order_frequency(broker)])
+    BASELINE = raw_data['Close'].iloc[-1] / raw_data['Close'].iloc[4] * 1000
     table.append(['BASELINE', BASELINE])
     print(
         tabulate(
@@ -70,3 +129,12 @@ if __name__ == "__main__":
             floatfmt=',.2f',
         )
     )
+
+    if args.profile:
+        broker = simulate(raw_data, broker_cls, args.profile, args.fee, instrument=True)
+        print()
+        print(tabulate(broker.instrumentation.summary_rows(), SUMMARY_HEADERS, floatfmt=',.2f'))
+        if args.metrics:
+            export = to_prometheus if args.metrics.endswith('.prom') else to_json
+            with open(args.metrics, 'w', encoding='utf-8') as f:
+                f.write(export([broker.instrumentation]))
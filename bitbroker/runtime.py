@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+REPLAY_CHUNK = 10000
+
+# Queue marker telling a broker task that no more candles will come.
+STOP = object()
+
+
+async def replay_feed(raw_data):
+    """Candles of a stored dataset, in order, as ``simulate`` feeds them."""
+    for start in range(0, len(raw_data), REPLAY_CHUNK):
+        for candle in raw_data.iloc[start : start + REPLAY_CHUNK].to_dict('records'):
+            yield candle
+
+
+async def polling_feed(fetch, interval):
+    """Poll the blocking ``fetch`` every ``interval`` seconds for the newest closed candle.
+
+    ``fetch`` runs in the default executor and returns a candle dict or ``None``; a candle
+    is yielded once, when its ``Date`` is seen for the first time.
+    """
+    loop = asyncio.get_running_loop()
+    last_date = None
+    while True:
+        candle = await loop.run_in_executor(None, fetch)
+        if candle is not None and candle['Date'] != last_date:
+            last_date = candle['Date']
+            yield candle
+        await asyncio.sleep(interval)
+
+
+class LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class Subscription:
+    def __init__(self, broker, start, queue_size):
+        self.broker = broker
+        self.start = start
+        self.queue = asyncio.Queue(queue_size)
+        self.latency = LatencyStats()
+
+
+class Runtime:
+    """Fan one candle feed out to many brokers running concurrently.
+
+    Every broker has a bounded queue, so a slow broker holds the feed back instead of
+    piling up candles. Latency is measured from the moment the runtime reads a candle
+    from the feed until the broker has acted on it.
+    """
+
+    def __init__(self, feed, queue_size=64):
+        self.feed = feed
+        self.queue_size = queue_size
+        self.subscriptions = []
+        self._stopping = None
+
+    def add(self, broker, start=0):
+        """Subscribe ``broker`` to the candles from feed position ``start`` onward."""
+        subscription = Subscription(broker, start, self.queue_size)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self, timeout=None):
+        """Feed all brokers until the feed ends, ``stop`` is called or ``timeout`` passes.
+
+        Candles already queued when stopping are still processed.
+        """
+        self._stopping = asyncio.Event()
+        if timeout is not None:
+            asyncio.get_running_loop().call_later(timeout, self.stop)
+
+        consumers = [self._consume(subscription) for subscription in self.subscriptions]
+        await asyncio.gather(self._fan_out(), *consumers)
+
+        return [subscription.broker for subscription in self.subscriptions]
+
+    async def _fan_out(self):
+        feed = self.feed.__aiter__()
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        position = 0
+        try:
+            while True:
+                next_candle = asyncio.ensure_future(feed.__anext__())
+                await asyncio.wait([next_candle, stopping], return_when=asyncio.FIRST_COMPLETED)
+                if stopping.done():
+                    next_candle.cancel()
+                    break
+
+                try:
+                    candle = next_candle.result()
+                except StopAsyncIteration:
+                    break
+
+                received = time.perf_counter()
+                for subscription in self.subscriptions:
+                    if position >= subscription.start:
+                        await subscription.queue.put((candle, received))
+                position += 1
+        finally:
+            stopping.cancel()
+            for subscription in self.subscriptions:
+                await subscription.queue.put(STOP)
+
+    async def _consume(self, subscription):
+        # Brokers may need to await something, like a batched prediction, before a step.
+        prepare = getattr(subscription.broker, 'prepare', None)
+        while True:
+            item = await subscription.queue.get()
+            if item is STOP:
+                return
+
+            candle, received = item
+            if prepare is not None:
+                await prepare(candle)
+            subscription.broker.step(candle)
+            subscription.latency.record(time.perf_counter() - received)
+
+
+def simulate_many(raw_data, combinations, queue_size=64):
+    """Replay ``raw_data`` once to every ``(broker_cls, period, fee)`` combination.
+
+    Each broker starts exactly like in ``run_simulation.simulate`` and is sold out at the
+    end, so the results are identical to simulating the combinations one by one.
+    """
+    close = raw_data['Close'].tolist()
+    runtime = Runtime(replay_feed(raw_data), queue_size)
+    for broker_cls, period, fee in combinations:
+        broker = broker_cls(period, close[: period * 2], None, fee)
+        runtime.add(broker, start=period * 2 + 1)
+
+    finished = asyncio.run(runtime.run())
+    for broker in finished:
+        broker._sell()
+
+    return finished
@@ -0,0 +1,120 @@
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from .brokers import Balance
+from .brokers import NoLossBroker
+from .equity import equity_curve
+from .positions import run_policies
+from .vectorized import get_desires
+from .vectorized import HullCache
+from .vectorized import run_positions
+from .vectorized import SkipHullCache
+
+COLUMNS = ['broker', 'period', 'fee', 'balance', 'order_frequency']
+# Hull series computed at once by sweep_desires, a bound on its memory.
+PREFETCH = 16
+
+
+def grid(broker_classes, periods, fees):
+    return [
+        (broker_cls, period, fee)
+        for broker_cls in broker_classes
+        for period in periods
+        for fee in fees
+    ]
+
+
+def hull_periods(broker_cls, period):
+    return [period * multiplier for multiplier in getattr(broker_cls, 'hull_multipliers', ())]
+
+
+def evaluate_fees(desires, prices, fees, initial=1000, no_loss=False):
+    """Final balance and order frequency of one desire array for every fee at once.
+
+    ``prices`` are the closes of the ticks. Every fee gets the balances
+    ``vectorized.run_positions`` would give it, from one compiled pass over the fees.
+    """
+    fees = np.asarray(fees, dtype=float)
+    counts, _, balances = run_policies(desires, prices, fees, Balance(initial, 0), no_loss)
+
+    balance = np.empty(len(fees))
+    order_frequency = np.empty(len(fees))
+    for j, (fee, count) in enumerate(zip(fees, counts)):
+        usd, btc = balances[j, count - 1] if count else (initial, 0)
+        balance[j] = btc * prices[-1] * (1 - fee) + usd
+        events = np.concatenate(([initial, 0], balances[j, :count].ravel()))
+        order_frequency[j] = len(np.unique(events))
+    order_frequency = order_frequency / (len(desires) + 1) * 100
+
+    return balance, order_frequency
+
+
+def sweep_desires(close, combinations, cache=None):
+    """Yield the tick closes and desires of every ``(broker, period)`` combination.
+
+    A broker at ``period`` gets the first ``2 * period`` closes as its initial data and
+    trades on every one after the next, as in ``simulate``. Each Hull series is computed
+    once over all the closes, with the next ones through ``hma_many``, shared by all the
+    combinations reading it and dropped after its last use; with a ``FeatureCache`` it is
+    read from disk when an earlier run already computed it.
+    """
+    hulls = HullCache(close, cache)
+    needed = [hull_periods(broker_cls, period) for broker_cls, period in combinations]
+    last_use = {n: i for i, periods in enumerate(needed) for n in periods}
+
+    for i, (broker_cls, period) in enumerate(combinations):
+        if any(n not in hulls.series for n in needed[i]):
+            # The next series computed together, sharing their sums and averages.
+            ahead = (n for periods in needed[i:] for n in periods if n not in hulls.series)
+            hulls.prefetch(list(dict.fromkeys(ahead))[:PREFETCH])
+
+        warmup = period * 2
+        skipped = SkipHullCache(hulls, warmup)
+        desires = get_desires(broker_cls, skipped.prices, period, warmup, skipped)
+        yield skipped.prices[warmup:], desires
+
+        for n in needed[i]:
+            if last_use[n] == i:
+                hulls.forget(n)
+
+
+def sweep(close, broker_classes, periods, fees, cache=None):
+    """Final balance and order frequency of every (broker, period, fee) combination.
+
+    The results are those of ``simulate``, see ``sweep_desires``.
+    """
+    combinations = [(b, p) for p in sorted(set(periods)) for b in broker_classes]
+    rows = []
+    for (broker_cls, period), (prices, desires) in zip(
+        combinations, sweep_desires(close, combinations, cache)
+    ):
+        no_loss = issubclass(broker_cls, NoLossBroker)
+        balance, order_frequency = evaluate_fees(desires, prices, fees, no_loss=no_loss)
+        rows.extend(
+            zip(repeat(broker_cls.__name__), repeat(period), fees, balance, order_frequency)
+        )
+
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def sweep_values(close, combinations, cache=None):
+    """USD value after every tick of every ``(broker, period, fee)`` combination.
+
+    The values are those of ``get_usd_values`` after ``simulate``, see ``sweep_desires``.
+    Returns them in the order of ``combinations``.
+    """
+    fees = {}
+    for broker_cls, period, fee in combinations:
+        fees.setdefault((broker_cls, period), []).append(fee)
+    pairs = sorted(fees, key=lambda pair: pair[1])
+
+    values = {}
+    for (broker_cls, period), (prices, desires) in zip(pairs, sweep_desires(close, pairs, cache)):
+        no_loss = issubclass(broker_cls, NoLossBroker)
+        for fee in fees[broker_cls, period]:
+            history, _ = run_positions(desires, prices, fee, no_loss=no_loss)
+            usd, btc = history.to_arrays()
+            values[broker_cls, period, fee] = equity_curve(usd[1:], btc[1:], prices).usd
+    return [values[combination] for combination in combinations]
@@ -1,31 +1,47 @@
 import argparse
 
+import numpy as np
 import pandas as pd
 import tensorflow as tf
 from tqdm import tqdm
 
-from . import brokers
-from .run_parallel_simulation import get_usd_series
+from . import model_brokers
+from .equity import get_usd_values
 from .run_simulation import get_order_frequency
+from .training import CHUNK_SIZE
+from .training import feature_names
+from .training import load_columns
+from .training import make_dataset
+from .training import rows_frame
+from .training import SHUFFLE_BUFFER
+from .training import split_rows
 
 
 def main(args):
-    training_point = "20190101"
-    # training_point = "20201201"
-    data = pd.read_pickle(args.data)
-    Xs = tf.convert_to_tensor(data.drop(['y', 'log10y', 'booly'], axis=1)[:training_point])
-    val = tf.convert_to_tensor(data.drop(['y', 'log10y', 'booly'], axis=1)[training_point:])
-    y = data['booly']
-    # y = data['log10y'] - data['log10close']
-    val_y = tf.convert_to_tensor(y[training_point:])
-    y = tf.convert_to_tensor(y[:training_point])
+    columns = load_columns(args.data)
+    features = feature_names(columns)
+    train_rows, val_rows = split_rows(columns['Date'], args.split)
+
+    booly = np.count_nonzero(columns['booly'])
     print(
-        f"{(data['booly'] == 1).sum() / len(data) * 100 :.2f} % {(data['booly'] == 0).sum() / len(data) * 100 :.2f} %"
+        f"{booly / len(columns['booly']) * 100 :.2f} % {(1 - booly / len(columns['booly'])) * 100 :.2f} %"
     )
 
     if args.train:
+        train = make_dataset(
+            columns,
+            train_rows,
+            features,
+            batch_size=args.batch_size,
+            chunk_size=args.chunk_size,
+            shuffle_buffer=args.shuffle_buffer,
+            interleave=args.interleave,
+        )
+        val = make_dataset(
+            columns, val_rows, features, batch_size=args.batch_size, chunk_size=args.chunk_size
+        )
 
-        inputs = tf.keras.Input(shape=(Xs.shape[1]))
+        inputs = tf.keras.Input(shape=(len(features),))
 
         model = tf.keras.layers.Dense(200, activation='gelu')(inputs)
         model = tf.keras.layers.Dense(200, activation='gelu')(model)
@@ -39,28 +55,21 @@ def main(args):
             metrics=['accuracy'],
         )
 
-        model.fit(
-            x=Xs, y=y, batch_size=args.batch_size, epochs=args.epochs, validation_data=(val, val_y)
-        )
+        model.fit(train, epochs=args.epochs, validation_data=val)
 
         model.save(args.model_path)
 
     else:
-        model = tf.keras.models.load_model(args.model_path)
-        dat = data.drop(['y', 'log10y', 'booly'], axis=1)[training_point:]
-        # data = pd.read_pickle('data/data.bitcoinchartsBTC-USD.2011.GRAN300.pkl.xz')[training_point:]
-        data = pd.read_pickle('data/data.bitcoinchartsBTC-USD.2011.resampled.GRAN900.pkl.xz')[
-            training_point:
-        ]
-        data = data[(100000 > data['Close']) & (data['Close'] > 100)]
-        data = data.drop(data.index[-1])
-        dat['prediction'] = model.predict(val)
+        dat = rows_frame(columns, val_rows, features)
 
         def gen():
-            for _, row in tqdm(dat[training_point:].iterrows(), total=len(dat[training_point:])):
+            for _, row in tqdm(dat.iterrows(), total=len(dat)):
                 yield row
 
-        broker = brokers.TestAIBroker(args.model_path, [], gen().__next__, fee=0.000)
+        broker = model_brokers.TestAIBroker(
+            args.model_path, [], gen().__next__, fee=0.000, feature_columns=features
+        )
+        broker.predict_window(dat)
 
         try:
             broker.run()
@@ -73,9 +82,12 @@ def main(args):
 
         import mplfinance as mpf
 
-        s = get_usd_series(broker, dat[training_point:].index, data)
+        # The features only keep the close, so it is drawn as a line.
+        close = 10 ** dat['log10close']
+        data = pd.DataFrame({column: close for column in ['Open', 'High', 'Low', 'Close']})
+        s = pd.Series(get_usd_values(broker, close.to_numpy()), index=dat.index)
         ai = mpf.make_addplot(s)
-        mpf.plot(data, type='candle', addplot=[ai])
+        mpf.plot(data, type='line', addplot=[ai])
 
 
 if __name__ == "__main__":
@@ -83,6 +95,18 @@ if __name__ == "__main__":
     parser.add_argument('--data', type=str, required=True, help='Path to the data file.')
     parser.add_argument("--learning_rate", default=0.0001, type=float, help="Learning rate.")
     parser.add_argument("--batch_size", default=8192, type=int, help="Batch size.")
+    parser.add_argument(
+        "--chunk_size", default=CHUNK_SIZE, type=int, help="Rows read from disk at once."
+    )
+    parser.add_argument(
+        "--shuffle_buffer", default=SHUFFLE_BUFFER, type=int, help="Rows shuffled together."
+    )
+    parser.add_argument(
+        "--interleave", default=2, type=int, help="Chunks read in parallel when training."
+    )
+    parser.add_argument(
+        "--split", default="20190101", type=str, help="Validate on the data from this date."
+    )
     parser.add_argument("--epochs", default=10, type=int, help="Training epochs.")
     parser.add_argument("--dropout", default=0.5, type=float, help="Dropout rate.")
     parser.add_argument("--model_path", default="model.model", type=str, help="Model save path.")
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from .cache import FeatureCache
+from .candles import _bound
+from .candles import CandleStore
+from .candles import is_candle_store
+from .candles import read_candles
+from .features import cached_features
+from .inference import NON_FEATURE_COLUMNS
+
+CHUNK_SIZE = 65536
+SHUFFLE_BUFFER = 262144
+
+
+def load_columns(path):
+    """Columns of the features at ``path`` by name.
+
+    A preprocessed candle store is memory-mapped, so only the rows in use are read. Any
+    other data is loaded into memory, raw candles get their features from the cache.
+    """
+    if is_candle_store(path):
+        store = CandleStore(path)
+        if 'booly' in store.columns:
+            return {column: store.column(column) for column in store.columns}
+
+    data = read_candles(path)
+    if 'booly' not in data:
+        data = cached_features(data.index, data['Close'], FeatureCache())
+    columns = {column: data[column].to_numpy() for column in data}
+    columns['Date'] = data.index.to_numpy()
+    return columns
+
+
+def feature_names(columns):
+    return [column for column in columns if column not in NON_FEATURE_COLUMNS]
+
+
+def split_rows(dates, timestamp):
+    """Rows before ``timestamp`` for training and the rest for validation.
+
+    Strings are read like ``.loc`` bounds, so ``"20190101"`` validates from that day on.
+    """
+    split = int(np.searchsorted(dates, _bound(timestamp, 'left').to_datetime64()))
+    return range(0, split), range(split, len(dates))
+
+
+def make_dataset(
+    columns,
+    rows,
+    features,
+    target='booly',
+    batch_size=8192,
+    chunk_size=CHUNK_SIZE,
+    shuffle_buffer=None,
+    interleave=1,
+    seed=None,
+):
+    """Batches of ``(features, target)`` of ``rows``, read from ``columns`` chunk by chunk.
+
+    With a ``shuffle_buffer`` the chunks are read in random order and their rows shuffled
+    within the buffer; ``interleave`` chunks are read in parallel.
+    """
+    starts = np.arange(rows.start, rows.stop, chunk_size)
+
+    def read_chunk(start):
+        end = min(start + chunk_size, rows.stop)
+        x = np.stack([np.asarray(columns[f][start:end], dtype=np.float32) for f in features], 1)
+        return x, np.asarray(columns[target][start:end], dtype=np.float32)
+
+    def chunk_dataset(start):
+        x, y = tf.numpy_function(read_chunk, [start], (tf.float32, tf.float32))
+        x = tf.ensure_shape(x, (None, len(features)))
+        y = tf.ensure_shape(y, (None,))
+        return tf.data.Dataset.from_tensor_slices((x, y))
+
+    dataset = tf.data.Dataset.from_tensor_slices(starts)
+    if shuffle_buffer:
+        dataset = dataset.shuffle(len(starts), seed=seed)
+    if interleave > 1:
+        dataset = dataset.interleave(
+            chunk_dataset,
+            cycle_length=interleave,
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=not shuffle_buffer,
+        )
+    else:
+        dataset = dataset.flat_map(chunk_dataset)
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def rows_frame(columns, rows, names=None):
+    """``rows`` of ``columns`` as a Date-indexed DataFrame."""
+    names = names or [column for column in columns if column != 'Date']
+    return pd.DataFrame(
+        {name: np.asarray(columns[name][rows.start : rows.stop]) for name in names},
+        index=pd.DatetimeIndex(columns['Date'][rows.start : rows.stop], name='Date'),
+    )
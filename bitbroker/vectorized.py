@@ -0,0 +1,246 @@
+import os
+from collections import namedtuple
+from functools import partial
+from math import sqrt
+
+import numpy as np
+
+from . import brokers
+from .brokers import Balance
+from .buffers import BalanceHistory
+from .cache import source_key
+from .indicators import hma
+from .indicators import hma_last_value
+from .indicators import hma_many
+from .indicators import HMA_VERSION
+from .positions import BUY
+from .positions import NONE
+from .positions import run_policy
+from .positions import SELL
+
+
+Simulation = namedtuple('Simulation', 'balance history')
+
+
+def hma_ticks(prices, n, warmup, hull=None):
+    """Value of ``hma_last_value(prices[: warmup + j + 1], n)`` for every tick ``j``.
+
+    Ticks whose window is still shorter than the Hull lookback are evaluated with
+    ``hma_last_value`` itself so that the warmup matches the event-driven brokers.
+    ``hull`` may hold an already computed ``hma(prices, n)``.
+    """
+    ticks = len(prices) - warmup
+    lag = n + int(sqrt(n)) - 2
+    first_valid = min(max(lag - warmup, 0), ticks)
+
+    values = np.empty(ticks)
+    for j in range(first_valid):
+        values[j] = hma_last_value(prices[: warmup + j + 1], n)
+    if first_valid < ticks:
+        hull = hma(prices, n) if hull is None else hull
+        values[first_valid:] = hull[warmup + first_valid - lag :]
+
+    return values
+
+
+class HullCache:
+    """Hull series of one price array, computed once per period and shared.
+
+    With a ``FeatureCache`` the series are also kept on disk for other runs and processes.
+    """
+
+    def __init__(self, prices, cache=None):
+        self.prices = np.asarray(prices, dtype=float)
+        self.series = {}
+        self.cache = cache
+        self._source = None
+
+    def hma(self, n):
+        if n not in self.series:
+            if self.cache is None:
+                self.series[n] = hma(self.prices, n)
+            else:
+                if self._source is None:
+                    self._source = source_key(self.prices)
+                compute = partial(hma, self.prices, n)
+                self.series[n] = self.cache.get(
+                    self._source, 'hma', {'n': n}, compute, HMA_VERSION
+                )
+        return self.series[n]
+
+    def prefetch(self, periods):
+        """Compute the missing series of ``periods`` together, with ``hma_many``.
+
+        With a ``FeatureCache`` the series already on disk are read instead.
+        """
+        periods = [n for n in dict.fromkeys(periods) if n not in self.series]
+        computed = periods
+        if self.cache is not None:
+            if self._source is None:
+                self._source = source_key(self.prices)
+            computed = [n for n in periods if not os.path.exists(self._path(n))]
+        rows = dict(zip(computed, hma_many(self.prices, computed)))
+
+        for n in periods:
+            # Copied out of the rows, so that every series is freed on its own.
+            lag = n + int(sqrt(n)) - 2
+            compute = partial(lambda row: row[lag:].copy(), rows.get(n))
+            if self.cache is None:
+                self.series[n] = compute()
+            else:
+                self.series[n] = self.cache.get(
+                    self._source, 'hma', {'n': n}, compute, HMA_VERSION
+                )
+
+    def _path(self, n):
+        return self.cache.path(self._source, 'hma', {'n': n}, HMA_VERSION)
+
+    def ticks(self, n, warmup):
+        return hma_ticks(self.prices, n, warmup, self.hma(n))
+
+    def forget(self, n):
+        self.series.pop(n, None)
+
+
+class SkipHullCache(HullCache):
+    """Hull series of ``hulls.prices`` without the price at ``skip``, from those of ``hulls``.
+
+    ``simulate`` skips the close right after the initial data of a broker. Only the
+    averages whose window covers the skipped price differ from the series over all the
+    prices, they are computed again from the prices around it.
+    """
+
+    def __init__(self, hulls, skip):
+        super().__init__(np.concatenate((hulls.prices[:skip], hulls.prices[skip + 1 :])))
+        self.hulls = hulls
+        self.skip = skip
+
+    def hma(self, n):
+        if n not in self.series:
+            full = self.hulls.hma(n)
+            lag = n + int(sqrt(n)) - 2
+            first = max(self.skip - lag, 0)
+            around = hma(self.prices[first : self.skip + lag], n)
+            self.series[n] = np.concatenate((full[:first], around, full[self.skip + 1 :]))
+        return self.series[n]
+
+
+def _simple_hull(hulls, period, warmup):
+    price = hulls.prices[warmup:]
+    hull = hulls.ticks(period, warmup)
+    return np.where(price < hull, SELL, BUY)
+
+
+def _crossover_hull(hulls, period, warmup):
+    fast = hulls.ticks(period, warmup)
+    slow = hulls.ticks(period * 2, warmup)
+    return np.where(fast > slow, BUY, SELL)
+
+
+def _crossover_inverse_hull(hulls, period, warmup):
+    fast = hulls.ticks(period, warmup)
+    slow = hulls.ticks(period * 2, warmup)
+    return np.where(fast < slow, BUY, SELL)
+
+
+def _crossover_jozef_combo_hull(hulls, period, warmup):
+    price = hulls.prices[warmup:]
+    fast = hulls.ticks(period, warmup)
+    slow = hulls.ticks(period * 2, warmup)
+    below = price < fast
+    return np.where(fast > slow, np.where(below, NONE, BUY), np.where(below, SELL, NONE))
+
+
+def _jozef_hull(hulls, period, warmup):
+    price = hulls.prices[warmup:]
+    # The broker starts with the last two averages of its initial data.
+    past_hma = hulls.ticks(period, warmup - 2)
+    hull = past_hma[2:]
+
+    trend_up = past_hma[2:] > past_hma[:-2]
+    last_trend = np.concatenate((np.ones_like(trend_up[:1]), trend_up[:-1]))
+
+    return np.where(trend_up != last_trend, np.where(price < hull, SELL, BUY), NONE)
+
+
+def _holdl(hulls, period, warmup):
+    return np.full(hulls.prices[warmup:].shape, BUY)
+
+
+DESIRES = [
+    (brokers.SimpleHullBroker, _simple_hull),
+    (brokers.CrossoverHullBroker, _crossover_hull),
+    (brokers.CrossoverInverseHullBroker, _crossover_inverse_hull),
+    (brokers.CrossoverJozefComboHullBroker, _crossover_jozef_combo_hull),
+    (brokers.JozefHullBroker, _jozef_hull),
+    (brokers.HoldlBroker, _holdl),
+]
+
+
+def _desire_fn(broker_cls):
+    if issubclass(broker_cls, brokers.TestBroker):
+        for base_cls, desire_fn in DESIRES:
+            if issubclass(broker_cls, base_cls):
+                return desire_fn
+    return None
+
+
+def is_vectorized(broker_cls):
+    return _desire_fn(broker_cls) is not None
+
+
+def get_desires(broker_cls, prices, period, warmup=None, hulls=None):
+    warmup = period * 2 if warmup is None else warmup
+    hulls = HullCache(prices) if hulls is None else hulls
+
+    desire_fn = _desire_fn(broker_cls)
+    if desire_fn is None:
+        raise NotImplementedError(f'{broker_cls.__name__} has no vectorized implementation')
+    return desire_fn(hulls, period, warmup)
+
+
+def get_trades(desires, initially_holding=False):
+    """Ticks at which the position flips and whether it is held after every tick."""
+    is_signal = desires != NONE
+    last_signal = np.maximum.accumulate(np.where(is_signal, np.arange(len(desires)), -1))
+
+    holding = np.where(
+        last_signal >= 0, desires[np.maximum(last_signal, 0)] == BUY, initially_holding
+    )
+    trades = np.flatnonzero(holding != np.concatenate(([initially_holding], holding[:-1])))
+
+    return trades, holding
+
+
+def run_positions(desires, prices, fee, balance=Balance(1000, 0), no_loss=False):
+    """Turn a desire array into the balance history of one position-state pass.
+
+    Returns the history, starting with ``balance``, and the balance after the last tick.
+    """
+    history = BalanceHistory([balance])
+    start = 0
+    for idx, traded in zip(*run_policy(desires, prices, fee, balance, no_loss)):
+        history.append(balance, idx - start)
+        balance = traded
+        start = idx
+    history.append(balance, len(desires) - start)
+
+    return history, balance
+
+
+def backtest(broker_cls, prices, period, fee, warmup=None, hulls=None):
+    """Vectorized counterpart of running a ``TestBroker`` and selling at the end.
+
+    ``prices`` holds the closes the broker sees: the first ``warmup`` values are its
+    initial ``available_data`` and every following value is one tick. ``hulls`` may be a
+    ``HullCache`` shared between backtests over the same prices.
+    """
+    warmup = period * 2 if warmup is None else warmup
+    prices = np.asarray(prices, dtype=float)
+
+    desires = get_desires(broker_cls, prices, period, warmup, hulls)
+    no_loss = issubclass(broker_cls, brokers.NoLossBroker)
+    history, balance = run_positions(desires, prices[warmup:], fee, no_loss=no_loss)
+    balance = Balance(balance.BTC * prices[-1] * (1 - fee) + balance.USD, 0)
+
+    return Simulation(balance, history)
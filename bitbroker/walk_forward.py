@@ -0,0 +1,197 @@
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+from . import run_parallel_simulation as parallel
+from .brokers import NoLossBroker
+from .cache import FeatureCache
+from .registry import BROKERS
+from .registry import get_broker
+from .run_simulation import load_data
+from .sweep import evaluate_fees
+from .sweep import hull_periods
+from .vectorized import get_desires
+from .vectorized import HullCache
+
+# Row positions of the candles a fold trains on, train_start:train_end, and tests on,
+# train_end:test_end.
+Fold = namedtuple('Fold', 'train_start train_end test_end')
+
+COLUMNS = [
+    'fold',
+    'broker',
+    'train_start',
+    'test_start',
+    'test_end',
+    'period',
+    'train_balance',
+    'test_balance',
+    'order_frequency',
+]
+
+# Hull series of the shared closes of a worker process, see load_shared_hulls.
+shared_hulls = None
+
+
+def split_folds(dates, n_folds, anchored=False):
+    """Split ``dates`` into ``n_folds`` consecutive train and test windows of equal time.
+
+    The time range is cut into ``n_folds + 1`` parts and each fold tests on the part after
+    the one it trains on. ``anchored`` folds train on everything before their test part.
+    """
+    dates = pd.DatetimeIndex(dates)
+    edges = np.linspace(dates[0].value, dates[-1].value, n_folds + 2)
+    bounds = dates.searchsorted(pd.DatetimeIndex(edges.astype('datetime64[ns]')))
+    bounds[-1] = len(dates)
+    if np.any(np.diff(bounds) == 0):
+        raise ValueError(f'Too many folds for the dates: {n_folds}')
+    return [
+        Fold(0 if anchored else bounds[i], bounds[i + 1], bounds[i + 2]) for i in range(n_folds)
+    ]
+
+
+class HullHead(HullCache):
+    """Hull series of ``hulls.prices[:end]``, the heads of the series of ``hulls``.
+
+    The Hull moving average only looks back, so the head of a series over all the prices
+    is the series over their head, warmup included. The series are read through ``hulls``,
+    and so from its ``FeatureCache``, when first asked for.
+    """
+
+    def __init__(self, hulls, end):
+        super().__init__(hulls.prices[:end])
+        self.hulls = hulls
+
+    def hma(self, n):
+        if n not in self.series:
+            series = self.hulls.hma(n)
+            dropped = len(self.hulls.prices) - len(self.prices)
+            self.series[n] = series[: max(len(series) - dropped, 0)]
+        return self.series[n]
+
+
+def score(broker_cls, hulls, period, fee, start, end):
+    """Final balance and order frequency of a broker trading the candles ``start:end``.
+
+    The broker starts with the candles before ``start`` as its history, at least the
+    ``2 * period`` ones it is given in a simulation.
+    """
+    start = max(start, period * 2)
+    head = HullHead(hulls, end)
+    desires = get_desires(broker_cls, head.prices, period, start, head)
+    no_loss = issubclass(broker_cls, NoLossBroker)
+    balance, order_frequency = evaluate_fees(desires, head.prices[start:], [fee], no_loss=no_loss)
+    return balance[0], order_frequency[0]
+
+
+def walk_fold(broker_cls, hulls, fold, periods, fee):
+    """Pick the period with the best balance on the fold's training window and test it."""
+    trained = [
+        (score(broker_cls, hulls, period, fee, fold.train_start, fold.train_end)[0], period)
+        for period in periods
+        if period * 2 < fold.train_end
+    ]
+    if not trained:
+        raise ValueError(
+            f'No period of {list(periods)} fits the training window of {fold}, '
+            f'the longest that does is {(fold.train_end - 1) // 2}'
+        )
+    train_balance, period = max(trained)
+    test_balance, order_frequency = score(
+        broker_cls, hulls, period, fee, fold.train_end, fold.test_end
+    )
+    return period, train_balance, test_balance, order_frequency
+
+
+def load_shared_hulls(directory, cache_directory):
+    parallel.load_shared_data(directory)
+    global shared_hulls
+    shared_hulls = HullCache(parallel.shared_data['Close'].values, FeatureCache(cache_directory))
+
+
+def parallel_helper_fold(over):
+    broker_cls, fold, periods, fee = over
+    return walk_fold(broker_cls, shared_hulls, fold, periods, fee)
+
+
+def walk_forward(raw_data, broker_classes, periods, fee, folds, processes=None, cache=None):
+    """Walk-forward results of every broker over ``folds``, one row per fold and broker.
+
+    Every Hull series is computed once over all the candles, before the folds are handed
+    to a process pool, and shared with the workers memory-mapped through ``cache``; a
+    temporary one is used when it is None. The folds slice these series, so overlapping
+    folds do not compute the warmup of their indicators again.
+    """
+    periods = sorted(set(periods))
+    tasks = [(broker_cls, fold, periods, fee) for fold in folds for broker_cls in broker_classes]
+
+    with tempfile.TemporaryDirectory() as directory:
+        if cache is None:
+            cache = FeatureCache(os.path.join(directory, 'features'), budget=float('inf'))
+        hulls = HullCache(raw_data['Close'].values, cache)
+        for broker_cls in broker_classes:
+            for period in periods:
+                for n in hull_periods(broker_cls, period):
+                    hulls.hma(n)
+
+        parallel.share_data(raw_data, directory)
+        initargs = directory, cache.directory
+        with mp.Pool(processes, initializer=load_shared_hulls, initargs=initargs) as pool:
+            results = pool.map(parallel_helper_fold, tasks)
+
+    dates = raw_data.index
+    rows = [
+        (
+            i // len(broker_classes),
+            broker_cls.__name__,
+            dates[fold.train_start],
+            dates[fold.train_end],
+            dates[fold.test_end - 1],
+            *result,
+        )
+        for i, ((broker_cls, fold, _, _), result) in enumerate(zip(tasks, results))
+    ]
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Choose Hull periods on rolling training windows and test them on the next.'
+    )
+    parser.add_argument('--data', type=str, required=True, help='Path to the data file.')
+    parser.add_argument('--start', default='20190101', help='First date of the data to use.')
+    parser.add_argument('--fee', default=0, type=float, help='Trading fee for bot.')
+    parser.add_argument(
+        '--brokers',
+        nargs='+',
+        default=['TestSimpleHullBroker'],
+        choices=sorted(BROKERS),
+        help='Brokers to test.',
+    )
+    parser.add_argument(
+        '--periods', nargs=3, default=[2, 150, 3], type=int, help='Range of Hull periods.'
+    )
+    parser.add_argument('--folds', default=5, type=int, help='Number of folds.')
+    parser.add_argument(
+        '--anchored', action='store_true', help='Train on all the data before each test.'
+    )
+    parser.add_argument('--no-cache', action='store_true', help='Do not keep Hull series.')
+    args = parser.parse_args()
+
+    raw_data = load_data(args.data, args.start)
+
+    results = walk_forward(
+        raw_data,
+        [get_broker(name) for name in args.brokers],
+        range(*args.periods),
+        args.fee,
+        split_folds(raw_data.index, args.folds, args.anchored),
+        cache=None if args.no_cache else FeatureCache(),
+    )
+    print(tabulate(results, headers='keys', showindex=False, floatfmt=',.2f'))
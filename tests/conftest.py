@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def random_walk():
+    def make(length=400, seed=0):
+        rng = np.random.default_rng(seed)
+        close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+        dates = pd.date_range('20190101', periods=length, freq='15min')
+        return pd.DataFrame({'Date': dates, 'Close': close}, index=dates)
+
+    return make
+
+
+@pytest.fixture(autouse=True, scope='session')
+def moon_cache(tmp_path_factory):
+    """Keep the lunar-phase tables of the tests out of the user's cache."""
+    from bitbroker import moon
+
+    moon._phases.cache_dir = str(tmp_path_factory.mktemp('moon'))
+    return moon._phases.cache_dir
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+import pytest
+
+from bitbroker import brokers
+from bitbroker import model_brokers
+from bitbroker.registry import get_broker
+
+
+def test_registry_resolves_names():
+    assert get_broker('TestSimpleHullBroker') is brokers.TestSimpleHullBroker
+    assert get_broker('TestAIBroker') is model_brokers.TestAIBroker
+    with pytest.raises(ValueError):
+        get_broker('NoSuchBroker')
+
+
+def test_hull_brokers_run_without_heavy_dependencies():
+    code = '\n'.join(
+        [
+            'import sys',
+            'sys.modules.update(dict.fromkeys(["tensorflow", "ephem"]))',
+            'from bitbroker.registry import get_broker',
+            'broker = get_broker("TestSimpleHullBroker")(2, [1.0, 2.0, 3.0, 4.0], None)',
+            'for close in [4.0, 3.0, 2.0, 1.0]:',
+            '    broker.step({"Close": close})',
+            'print(len(broker.history))',
+        ]
+    )
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert output.stdout.strip() == '5', output.stderr
+
+
+def test_hull_brokers_leave_out_model_brokers():
+    code = 'import sys, bitbroker.brokers; print("bitbroker.inference" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert output.stdout.strip() == 'False', output.stderr
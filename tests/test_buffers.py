@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from bitbroker.brokers import Balance
+from bitbroker.buffers import BalanceHistory
+from bitbroker.buffers import RingBuffer
+
+
+@pytest.mark.parametrize("capacity", [1, 3, 5])
+def test_ring_buffer_keeps_newest(capacity):
+    data = list(range(12))
+    buffer = RingBuffer(capacity, data[:2])
+    for x in data[2:]:
+        buffer.append(x)
+
+    assert len(buffer) == capacity
+    assert buffer.tolist() == data[-capacity:]
+    assert buffer[-1] == data[-1]
+    assert np.asarray(buffer).tolist() == data[-capacity:]
+
+
+def test_ring_buffer_not_full():
+    buffer = RingBuffer(5, [1, 2])
+    assert len(buffer) == 2
+    assert buffer[-2:].tolist() == [1, 2]
+
+
+def test_balance_history_rebuilds_series():
+    balances = [Balance(1000, 0)] * 3 + [Balance(0, 2.5)] * 2 + [Balance(1100, 0)]
+    history = BalanceHistory(balances)
+
+    assert len(history) == len(balances)
+    assert len(history.events()) == 3
+    assert list(history) == balances
+    assert history[3] == balances[3]
+    assert history[-1] == balances[-1]
+    assert history[1:4] == balances[1:4]
+    assert history == balances
+
+    usd, btc = history.to_arrays()
+    assert usd.tolist() == [b.USD for b in balances]
+    assert btc.tolist() == [b.BTC for b in balances]
+
+
+def test_balance_history_append_count():
+    history = BalanceHistory([Balance(1000, 0)])
+    history.append(Balance(1000, 0), 2)
+    history.append(Balance(0, 1), 0)
+    history.append(Balance(0, 1), 4)
+
+    assert len(history) == 7
+    assert history.events() == [Balance(1000, 0), Balance(0, 1)]
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitbroker import brokers
+from bitbroker import vectorized
+from bitbroker.cache import FeatureCache
+from bitbroker.cache import source_key
+from bitbroker.features import cached_features
+from bitbroker.features import compute_features
+from bitbroker.indicators import hma
+from bitbroker.sweep import sweep
+from bitbroker.vectorized import HullCache
+
+
+def test_computes_once_across_instances(tmp_path):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return np.arange(5.0)
+
+    source = source_key(np.arange(3.0))
+    first = FeatureCache(str(tmp_path)).get(source, 'hma', {'n': 3}, compute)
+    second = FeatureCache(str(tmp_path))
+    again = second.get(source, 'hma', {'n': 3}, compute)
+
+    assert len(calls) == 1 and second.hits == 1
+    assert again.tolist() == first.tolist()
+    assert source != source_key(np.arange(3))
+    assert source != source_key(np.arange(4.0))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = FeatureCache(str(tmp_path), budget=3 * (128 + 800))
+    for n in range(3):
+        cache.get('source', 'hma', {'n': n}, lambda: np.zeros(100))
+        os.utime(cache.path('source', 'hma', {'n': n}), (n, n))
+
+    cache.get('source', 'hma', {'n': 0}, pytest.fail)
+    cache.get('source', 'hma', {'n': 3}, lambda: np.zeros(100))
+
+    cached = [n for n in range(4) if os.path.exists(cache.path('source', 'hma', {'n': n}))]
+    assert cached == [0, 2, 3]
+    assert cache.size() <= cache.budget
+
+
+def test_sweep_reads_hulls_from_cache(random_walk, tmp_path):
+    close = random_walk(500)['Close']
+    args = close, [brokers.TestCrossoverHullBroker], range(2, 30, 3), [0, 0.001]
+    expected = sweep(*args)
+
+    cache = FeatureCache(str(tmp_path))
+    first = sweep(*args, cache=cache)
+    misses = cache.misses
+    second = sweep(*args, cache=cache)
+
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+    assert cache.misses == misses > 0 and cache.hits == misses
+
+
+def test_cached_features(random_walk, tmp_path):
+    close = random_walk(500)['Close']
+    expected = compute_features(close.index, close).dropna()
+
+    cache = FeatureCache(str(tmp_path))
+    pd.testing.assert_frame_equal(cached_features(close.index, close, cache), expected)
+    pd.testing.assert_frame_equal(cached_features(close.index, close, cache), expected)
+    assert cache.hits == cache.misses == 4
+
+
+def test_new_version_misses(random_walk, tmp_path, monkeypatch):
+    close = random_walk(300)['Close'].to_numpy()
+    cache = FeatureCache(str(tmp_path))
+    source = source_key(close)
+    cache.get(source, 'hma', {'n': 3}, lambda: np.zeros(5), version=1)
+    assert cache.get(source, 'hma', {'n': 3}, lambda: np.ones(5), version=2).tolist() == [1] * 5
+
+    HullCache(close, cache).hma(10)
+    HullCache(close, cache).hma(10)
+    monkeypatch.setattr(vectorized, 'HMA_VERSION', vectorized.HMA_VERSION + 1)
+    HullCache(close, cache).hma(10)
+    assert cache.misses == 4 and cache.hits == 1
+
+
+def test_prefetch_reads_cached_hulls(random_walk, tmp_path):
+    close = random_walk(500)['Close'].to_numpy()
+    cache = FeatureCache(str(tmp_path))
+    HullCache(close, cache).hma(10)
+
+    hulls = HullCache(close, cache)
+    hulls.prefetch([5, 10, 20, 5])
+    assert cache.hits == 1 and cache.misses == 3
+    for n in [5, 10, 20]:
+        assert hulls.series[n] == pytest.approx(hma(close, n), rel=1e-12)
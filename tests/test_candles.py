@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitbroker.candles import CandleStore
+from bitbroker.candles import convert
+from bitbroker.candles import read_candles
+from bitbroker.candles import tagged_path
+
+
+@pytest.fixture
+def candles():
+    dates = pd.date_range('20181230', periods=96 * 5, freq='15min')
+    close = np.linspace(100, 200, len(dates))
+    frame = pd.DataFrame(
+        {'Date': dates, 'Open': close, 'High': close, 'Low': close, 'Close': close},
+        index=pd.DatetimeIndex(dates),
+    )
+    frame['Volume'] = 1.0
+    return frame
+
+
+def test_store_roundtrip(tmp_path, candles):
+    path = str(tmp_path / 'data.candles')
+    CandleStore.create(path, candles[:100]).append(candles[100:])
+
+    store = CandleStore(path)
+    assert len(store) == len(candles)
+    assert isinstance(store.column('Close'), np.memmap)
+    pd.testing.assert_frame_equal(read_candles(path), candles, check_names=False, check_freq=False)
+
+
+@pytest.mark.parametrize("start, end", [("20190101", None), (None, "20181231"), ("2019", "2019")])
+def test_store_date_slicing(tmp_path, candles, start, end):
+    path = str(tmp_path / 'data.candles')
+    CandleStore.create(path, candles)
+
+    result = read_candles(path, start, end)
+    expected = candles.loc[start:end]
+    assert result.index.equals(expected.index)
+    assert CandleStore(path).rows(start, end) == slice(
+        candles.index.get_loc(expected.index[0]), candles.index.get_loc(expected.index[-1]) + 1
+    )
+
+
+def test_store_rejects_unordered_append(tmp_path, candles):
+    store = CandleStore.create(str(tmp_path / 'data.candles'), candles[100:])
+    with pytest.raises(ValueError):
+        store.append(candles[:100])
+
+
+def test_store_append_after_interrupted_append(tmp_path, candles):
+    path = str(tmp_path / 'data.candles')
+    CandleStore.create(path, candles[:100])
+    # An append stopped after writing a value to one of the columns only.
+    with open(CandleStore._column_path(path, 'Close'), 'ab') as f:
+        f.write(np.float64(99).tobytes())
+
+    CandleStore(path).append(candles[100:])
+    pd.testing.assert_frame_equal(read_candles(path), candles, check_names=False, check_freq=False)
+
+
+def test_convert_json(tmp_path, candles):
+    rows = candles[['Low', 'High', 'Open', 'Close', 'Volume']].copy()
+    rows.insert(0, 'Date', (candles.index - pd.Timestamp(0)) // pd.Timedelta('1s'))
+    path = tmp_path / 'data.BTC-USD.2018-12-30.GRAN900.json'
+    # get_historic_data dumps candles newest first with the seam duplicated
+    data = rows.values.tolist()[::-1]
+    path.write_text(json.dumps(data[:10] + data[9:]))
+
+    store = convert(str(path))
+
+    assert store.path == str(tmp_path / 'data.BTC-USD.2018-12-30.GRAN900.candles')
+    assert store.to_frame()['Close'].tolist() == candles['Close'].tolist()
+
+
+def test_convert_pickle(tmp_path, candles):
+    path = str(tmp_path / 'data.pkl.xz')
+    candles.to_pickle(path)
+    assert len(convert(path)) == len(candles)
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ('data.BTC.GRAN900.pkl.xz', 'data.BTC.GRAN900.simple.pkl.xz'),
+        ('data.BTC.GRAN900.candles', 'data.BTC.GRAN900.simple.candles'),
+        ('data.BTC.GRAN900.candles/', 'data.BTC.GRAN900.simple.candles'),
+    ],
+)
+def test_tagged_path(path, expected):
+    assert tagged_path(path, 'simple') == expected
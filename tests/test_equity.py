@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitbroker import brokers
+from bitbroker.equity import btc_values
+from bitbroker.equity import broker_equity
+from bitbroker.equity import equity_curve
+from bitbroker.equity import get_usd_series
+from bitbroker.run_simulation import simulate
+
+
+def test_usd_series_matches_history(random_walk):
+    raw_data = random_walk(300)
+    broker, index = simulate(raw_data, brokers.TestSimpleHullBroker, 4, 0.001, True)
+
+    expected = [
+        balance.USD if balance.USD > 0 else balance.BTC * raw_data.loc[ts].Close
+        for balance, ts in zip(broker.history[1:], index)
+    ]
+    series = get_usd_series(broker, index, raw_data)
+    assert series.index.equals(pd.DatetimeIndex(index))
+    assert series.tolist() == expected
+
+    curve = broker_equity(broker, raw_data['Close'].to_numpy()[9:])
+    assert curve.usd.tolist() == expected
+    assert set(curve.exposure) == {0, 1}
+
+
+def test_equity_curve():
+    usd = np.array([1000, 0, 0, 0, 1100])
+    btc = np.array([0, 1, 1, 1, 0])
+    close = np.array([900, 1000, 1250, 1000, 1000])
+
+    curve = equity_curve(usd, btc, close)
+
+    assert curve.usd.tolist() == [1000, 1000, 1250, 1000, 1100]
+    assert curve.drawdown == pytest.approx([0, 0, 0, -0.2, -0.12])
+    assert curve.returns == pytest.approx([0, 0, 0.25, -0.2, 0.1])
+    assert curve.exposure.tolist() == [0, 1, 1, 1, 0]
+
+
+def test_btc_values():
+    values = pd.DataFrame({'A': [1000.0, 2000.0], 'B': [1000.0, 500.0]})
+    close = pd.Series([1000.0, 2000.0])
+
+    assert btc_values(values, close, 2).tolist() == [[2, 2], [2, 0.5]]
+    assert btc_values(values['A'], close).tolist() == [1, 1]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitbroker.candles import CandleStore
+from bitbroker.features import compute_features
+from bitbroker.features import preprocess
+from bitbroker.features import write_features
+from bitbroker.indicators import decayed_sum
+from bitbroker.indicators import hull_rsi
+from bitbroker.indicators import rsi
+
+
+def pandas_wma(series, n):
+    weights = np.arange(1, n + 1)
+    return series.rolling(n).apply(lambda window: window @ weights / weights.sum(), raw=True)
+
+
+def pandas_hma(series, n):
+    return pandas_wma(2 * pandas_wma(series, n // 2) - pandas_wma(series, n), int(np.sqrt(n)))
+
+
+@pytest.fixture
+def close(random_walk):
+    return random_walk(3000)['Close']
+
+
+@pytest.mark.parametrize('decay', [0.001, 0.5, 13 / 14, 0.9999])
+def test_decayed_sum(decay):
+    data = np.random.default_rng(0).random(1000)
+    expected, y = [], 2.0
+    for x in data:
+        y = x + decay * y
+        expected.append(y)
+
+    assert decayed_sum(data, decay, 2.0) == pytest.approx(expected, rel=1e-12)
+
+
+def test_rsi_matches_pandas(close):
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / 14).mean()
+    expected = 100 - 100 / (1 + gain / loss)
+
+    np.testing.assert_allclose(rsi(close.to_numpy()), expected, rtol=1e-12)
+
+
+def test_hull_rsi_matches_pandas(close):
+    delta = close.diff()
+    gain = pandas_hma(delta.clip(lower=0), 14)
+    loss = pandas_hma((-delta).clip(lower=0), 14)
+    expected = 100 - 100 / (1 + gain / loss)
+
+    np.testing.assert_allclose(hull_rsi(close.to_numpy()), expected, rtol=1e-9)
+
+
+def test_features(close):
+    features = compute_features(close.index, close)
+
+    assert (features['%_ath'] == close / close.cummax()).all()
+    assert (features['%gain'] == close.shift(1) / close - 1).iloc[1:].all()
+    assert features['%y'].iloc[:-1].tolist() == features['%gain'].iloc[1:].tolist()
+    assert features['booly'].tolist() == (close.shift(-1) > close).tolist()
+    assert (features.filter(like='dayofweek_').sum(axis=1) <= 1).all()
+
+
+def test_chunks_match_whole(close, tmp_path):
+    whole = next(preprocess(close.index, close.to_numpy(), chunk_size=len(close)))
+    chunks = list(preprocess(close.index, close.to_numpy(), chunk_size=700))
+    chunked = pd.concat(chunks)
+
+    assert len(chunks) == 5
+    assert whole.index.equals(chunked.index)
+    pd.testing.assert_frame_equal(whole, chunked, check_exact=False, rtol=1e-12)
+
+    store = write_features(close.index, close.to_numpy(), str(tmp_path / 'f.candles'), 700)
+    stored = CandleStore(store.path).to_frame()
+    pd.testing.assert_frame_equal(stored[whole.columns], whole, check_freq=False)
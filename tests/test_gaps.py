@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitbroker.gaps import drop_duplicates
+from bitbroker.gaps import fill_gaps
+from bitbroker.gaps import find_gaps
+
+
+def test_drop_duplicates_list():
+    data = [[300, 1], [300, 2], [200, 3], [100, 4], [100, 5], [100, 6], [0, 7]]
+    assert drop_duplicates(data) == [[300, 1], [200, 3], [100, 4], [0, 7]]
+
+
+def test_drop_duplicates_frame():
+    dates = pd.to_datetime([0, 60, 60, 120], unit='s')
+    frame = pd.DataFrame({'Date': dates, 'Close': [1.0, 2.0, 3.0, 4.0]})
+    assert drop_duplicates(frame)['Close'].tolist() == [1.0, 2.0, 4.0]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_find_gaps(descending):
+    timestamps = np.array([0, 60, 120, 300, 360, 600])
+    timestamps = timestamps[::-1] if descending else timestamps
+
+    gaps = find_gaps(timestamps, 60)
+
+    assert sorted(gaps['missing']) == [2, 3]
+    assert gaps['start'].sort_values().tolist() == list(pd.to_datetime([120, 360], unit='s'))
+    assert gaps['end'].sort_values().tolist() == list(pd.to_datetime([300, 600], unit='s'))
+
+
+def test_find_gaps_none():
+    gaps = find_gaps(np.arange(0, 6000, 60), 60)
+    assert len(gaps) == 0
+    assert list(gaps.columns) == ['start', 'end', 'missing']
+
+
+@pytest.fixture
+def gappy():
+    dates = pd.to_datetime([0, 60, 240, 300], unit='s')
+    return pd.DataFrame(
+        {'Date': dates, 'Open': 1.0, 'Close': [1.0, 2.0, 3.0, 4.0], 'Volume': 5.0},
+        index=pd.DatetimeIndex(dates, name='Date'),
+    )
+
+
+def test_fill_gaps_ffill(gappy):
+    filled = fill_gaps(gappy, 60)
+    assert len(filled) == 6
+    assert filled['Close'].tolist() == [1, 2, 2, 2, 3, 4]
+    assert filled['Open'].tolist() == [1, 1, 2, 2, 1, 1]
+    assert filled['Volume'].tolist() == [5, 5, 0, 0, 5, 5]
+    assert (filled['Date'] == filled.index).all()
+
+
+def test_fill_gaps_mark(gappy):
+    marked = fill_gaps(gappy, 60, method='mark')
+    assert marked['gap'].tolist() == [False, False, True, True, False, False]
+    assert marked['Close'].isna().sum() == 2
@@ -0,0 +1,175 @@
+import calendar
+import datetime
+import importlib.util
+import json
+import threading
+import time
+from argparse import Namespace
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+import pytest
+import requests
+
+spec = importlib.util.spec_from_file_location(
+    'get_historic_data', Path(__file__).parents[1] / 'tools' / 'get_historic_data.py'
+)
+get_historic_data = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(get_historic_data)
+
+GRANULARITY = 86400
+
+
+def epoch(isoformat):
+    return calendar.timegm(datetime.datetime.fromisoformat(isoformat).timetuple())
+
+
+class CandleHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = {key: value[0] for key, value in parse_qs(urlparse(self.path).query).items()}
+        granularity = int(params['granularity'])
+        self.server.requested.append(params['start'])
+
+        failures = self.server.failures.get(params['start'], [])
+        if failures:
+            self.send_response(failures.pop(0))
+            self.end_headers()
+            return
+
+        first = -(-epoch(params['start']) // granularity) * granularity
+        timestamps = range(first, epoch(params['end']) + 1, granularity)
+        candles = [[t, 1.0, 3.0, 2.0, float(t), 10.0] for t in reversed(timestamps)]
+
+        body = json.dumps(candles).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CandleHandler)
+    server.requested, server.failures = [], {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def args(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    startdate = datetime.date.today() - datetime.timedelta(days=1700)
+    return Namespace(
+        product='BTC-USD',
+        startdate=startdate.isoformat(),
+        granularity=GRANULARITY,
+        format='json',
+        endpoint=f'http://127.0.0.1:{server.server_port}/products/BTC-USD/candles',
+        workers=3,
+        rate=1000,
+        backoff=0.01,
+        update=False,
+    )
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    monkeypatch.setenv('TZ', 'Etc/GMT+5')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def assert_continuous(data, args):
+    timestamps = [candle[0] for candle in data]
+    assert timestamps[0] - timestamps[-1] == (len(data) - 1) * GRANULARITY
+    assert all(a - b == GRANULARITY for a, b in zip(timestamps, timestamps[1:]))
+    assert timestamps[-1] == epoch(args.startdate)
+
+
+def test_download_retries_rate_limits(server, args):
+    windows = get_historic_data.get_windows(args)
+    server.failures[windows[1][0].isoformat()] = [429, 503]
+
+    get_historic_data.main(args)
+
+    assert_continuous(get_historic_data.load_saved(args), args)
+    assert len(server.requested) == len(windows) + 2
+    assert not Path(get_historic_data.generate_filename(args) + '.part').exists()
+
+
+def test_download_resumes_from_journal(server, args):
+    windows = get_historic_data.get_windows(args)
+    failing = windows[len(windows) // 2][0].isoformat()
+    server.failures[failing] = [400]
+
+    with pytest.raises(requests.HTTPError):
+        get_historic_data.main(args)
+
+    journal_path = get_historic_data.generate_filename(args) + '.part'
+    journaled = {start for start, _ in get_historic_data.read_journal(journal_path)}
+    assert journaled and failing not in journaled
+
+    server.requested.clear()
+    get_historic_data.main(args)
+
+    newest = windows[0][0].isoformat()
+    assert failing in server.requested
+    assert not (set(server.requested) - {newest}) & journaled
+    assert_continuous(get_historic_data.load_saved(args), args)
+
+
+def test_progress_counts_journaled_windows(server, args, monkeypatch):
+    windows = get_historic_data.get_windows(args)
+    progress = []
+
+    class Progress(get_historic_data.tqdm):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            progress.append(self)
+
+    monkeypatch.setattr(get_historic_data, 'tqdm', Progress)
+    journal_path = get_historic_data.generate_filename(args) + '.part'
+    with open(journal_path, 'w', encoding='utf-8') as journal:
+        for window in windows[2:] + [(windows[0][1], windows[0][1])]:
+            journal.write(json.dumps([*get_historic_data.window_key(window), []]) + '\n')
+
+    get_historic_data.download(args, windows, journal_path)
+
+    assert len(server.requested) == 2
+    assert progress[0].n == progress[0].total == len(windows)
+
+
+@pytest.mark.parametrize("data_format", ['json', 'pd'])
+def test_update_fetches_only_new_candles(server, args, data_format):
+    args.format = data_format
+    get_historic_data.main(args)
+
+    stale = get_historic_data.load_saved(args)[10:]
+    stale[0][4] = -1.0
+    get_historic_data.save(stale, args)
+
+    server.requested.clear()
+    args.update = True
+    get_historic_data.main(args)
+
+    data = get_historic_data.load_saved(args)
+    assert len(server.requested) == 1
+    assert_continuous(data, args)
+    assert all(candle[4] == candle[0] for candle in data)
+
+
+def test_windows_end_now_in_utc(args, local_timezone):
+    utc = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    end = get_historic_data.get_windows(args)[0][1]
+
+    assert abs(end - utc) < datetime.timedelta(minutes=1)
@@ -1,8 +1,12 @@
+import numpy as np
 import pandas as pd
 import pytest
 
 from bitbroker.indicators import hma
 from bitbroker.indicators import hma_last_value
+from bitbroker.indicators import hma_many
+from bitbroker.indicators import StreamingHMA
+from bitbroker.indicators import StreamingWMA
 from bitbroker.indicators import wma
 from bitbroker.indicators import wma_last_value
 
@@ -51,6 +55,39 @@ def test_hma_last_value_long():
     assert result == expected
 
 
+@pytest.mark.parametrize("n", [2, 3, 16, 100])
+def test_wma_matches_convolution(n):
+    # A long random walk far from zero, where plain prefix sums would lose digits.
+    data = 1e4 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 200000)))
+    weights = np.arange(n) + 1
+    expected = np.convolve(data, weights[::-1], mode='valid') / weights.sum()
+
+    assert wma(data, n) == pytest.approx(expected, rel=1e-13)
+
+
+def test_hma_many():
+    data = ohlc['close'].to_numpy()
+    periods = [2, 5, 16, 31, 100]
+    result = hma_many(data, periods)
+
+    assert result.shape == (len(periods), len(data))
+    for row, n in zip(result, periods):
+        expected = hma(data, n)
+        assert np.isnan(row[: -len(expected)]).all()
+        assert row[-len(expected) :] == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("length", [0, 3, 10, 19, 20, 22])
+def test_hma_short_data(length):
+    data = np.arange(length, dtype=float)
+    periods = [5, 20]
+
+    assert len(hma(data, 20)) == 0
+    result = hma_many(data, periods)
+    assert result.shape == (len(periods), length)
+    assert np.isnan(result[1]).all()
+
+
 @pytest.mark.parametrize(
     "test_input, expected",
     [
@@ -71,3 +108,26 @@ def test_wma_last_value(test_input, expected):
 def test_hma_last_value(test_input, expected):
     result = hma_last_value(*test_input)
     assert result == expected
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [([0, 0, 1], 3), ([0, 0, 1], 2), ([1, 10, 100, 1000, 6, 0, 0, 3, 2, 9, 1], 3)],
+)
+def test_streaming_wma(test_input):
+    data, n = test_input
+    indicator = StreamingWMA(n)
+    result = [indicator.update(x) for x in data]
+    assert np.isnan(result[: n - 1]).all()
+    assert result[n - 1 :] == pytest.approx(wma(data, n))
+
+
+@pytest.mark.parametrize("n", [2, 3, 16, 31, 100])
+def test_streaming_hma_matches_hma(n):
+    data = ohlc['close'].tolist()
+    indicator = StreamingHMA(n)
+    result = [indicator.update(x) for x in data]
+    expected = hma(data, n)
+
+    assert np.isnan(result[: -len(expected)]).all()
+    assert result[-len(expected) :] == pytest.approx(expected, rel=0, abs=1e-9)
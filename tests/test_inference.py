@@ -0,0 +1,75 @@
+import asyncio
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from bitbroker import model_brokers
+from bitbroker.inference import Predictor
+from bitbroker.runtime import Runtime
+from bitbroker.runtime import replay_feed
+
+
+class FakeModel:
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, features, batch_size=None):
+        self.batches.append(len(features))
+        # Buys on the last feature, which is '%y' with the opposite sign if it leaks in.
+        return (features[:, -1:] > 0).astype(np.float32)
+
+
+def candles(length=50, seed=0):
+    rng = np.random.default_rng(seed)
+    move = rng.normal(size=length)
+    return pd.DataFrame(
+        {'log10close': 4 + rng.normal(0, 0.01, length).cumsum(), 'move': move, '%y': -move}
+    )
+
+
+def run_broker(broker, data):
+    for _, candle in data.iterrows():
+        broker.step(candle)
+    return broker
+
+
+def test_predict_window_batches_backtest():
+    data = candles()
+    model = FakeModel()
+    batched = model_brokers.TestAIBroker(None, [], None, predictor=Predictor(model=model))
+    batched.predict_window(data)
+    run_broker(batched, data)
+
+    precomputed = model_brokers.TestAIBroker(
+        None, [], None, predictor=Predictor(model=FakeModel())
+    )
+    run_broker(precomputed, data.assign(prediction=(data['move'] > 0).astype(float)))
+
+    assert model.batches == [len(data)]
+    assert len(set(batched.history)) > 4
+    assert batched.history == precomputed.history
+    assert batched.balance == precomputed.balance
+
+
+def test_runtime_micro_batches_live_predictions():
+    data = candles(20)
+    model = FakeModel()
+    predictor = Predictor(model=model, max_delay=0.01)
+    runtime = Runtime(replay_feed(data))
+    for _ in range(5):
+        runtime.add(model_brokers.TestAIBroker(None, [], None, predictor=predictor))
+
+    finished = asyncio.run(runtime.run())
+
+    expected = model_brokers.TestAIBroker(None, [], None, predictor=Predictor(model=FakeModel()))
+    run_broker(expected, data)
+    assert model.batches == [5] * len(data)
+    assert all(broker.history == expected.history for broker in finished)
+
+
+def test_brokers_import_without_tensorflow():
+    code = 'import sys, bitbroker.brokers; print("tensorflow" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert output.stdout.strip() == 'False'
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from bitbroker import brokers
+from bitbroker.instrumentation import Histogram
+from bitbroker.instrumentation import STAGES
+from bitbroker.instrumentation import to_json
+from bitbroker.instrumentation import to_prometheus
+from bitbroker.run_simulation import simulate
+
+
+@pytest.mark.parametrize(
+    "broker_cls",
+    [brokers.TestSimpleHullBroker, brokers.TestNoLossCrossoverHullBroker, brokers.TestMoonBroker],
+)
+def test_instrumented_run_is_unchanged(random_walk, broker_cls):
+    raw_data = random_walk()
+
+    plain = simulate(raw_data, broker_cls, 5, 0.001)
+    instrumented = simulate(raw_data, broker_cls, 5, 0.001, instrument=True)
+
+    assert instrumented.balance == plain.balance
+    assert instrumented.history == plain.history
+
+    counters = instrumented.instrumentation.counters
+    history = list(plain.history)
+    assert counters['trades'] == sum(a != b for a, b in zip(history, history[1:]))
+    assert counters['ticks'] == len(history) - 1
+    assert instrumented.instrumentation.stages['fetch'].count == counters['ticks']
+    assert counters['indicator_seconds'] > 0
+
+
+def test_disabled_instrumentation_leaves_broker_alone(random_walk):
+    broker = simulate(random_walk(), brokers.TestSimpleHullBroker, 5, 0)
+
+    assert not hasattr(broker, 'instrumentation')
+    # The data feed is always an attribute of the broker, the methods only when instrumented.
+    assert not set(STAGES.values()) - {'get_fresh_candle'} & set(vars(broker))
+
+
+def test_histogram():
+    hist = Histogram()
+    for seconds in [2e-6, 3e-6, 4e-6, 0.2]:
+        hist.observe(seconds)
+
+    assert hist.count == 4
+    assert hist.mean == pytest.approx(0.05000225)
+    assert hist.quantile(0.5) == 5e-6
+    assert hist.quantile(0.99) == 0.25
+
+
+def test_exports(random_walk):
+    broker = simulate(random_walk(), brokers.TestSimpleHullBroker, 5, 0, instrument=True)
+    ticks = broker.instrumentation.counters['ticks']
+
+    exported = json.loads(to_json([broker.instrumentation]))
+    assert exported[0]['broker'] == 'TestSimpleHullBroker'
+    assert exported[0]['stages']['tick']['count'] == ticks
+
+    text = to_prometheus([broker.instrumentation])
+    assert f'bitbroker_ticks_total{{broker="TestSimpleHullBroker"}} {ticks}\n' in text
+    labels = 'broker="TestSimpleHullBroker",stage="tick"'
+    assert f'bitbroker_stage_seconds_bucket{{{labels},le="+Inf"}} {ticks}\n' in text
+    assert f'bitbroker_stage_seconds_count{{{labels}}} {ticks}\n' in text
@@ -0,0 +1,69 @@
+import ephem
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitbroker import brokers
+from bitbroker import moon
+from bitbroker.moon import LunarPhases
+
+
+def ephem_waxing(date):
+    return ephem.previous_full_moon(date) < ephem.previous_new_moon(date)
+
+
+@pytest.fixture
+def near_moons():
+    # The minutes around a new and a full moon, where the phase flips.
+    around = []
+    for instant in [ephem.next_new_moon('2020/6/1'), ephem.next_full_moon('2020/6/1')]:
+        center = pd.Timestamp(instant.datetime()).floor('min')
+        around.append(pd.date_range(center - pd.Timedelta('5min'), periods=10, freq='min'))
+    return around[0].append(around[1])
+
+
+@pytest.fixture
+def dates(near_moons):
+    # Every 7 minutes over three years, with the minutes around a new and a full moon.
+    coarse = pd.date_range('2019-12-31 22:00', '2022-01-02', freq='7min')
+    return coarse.append(near_moons).sort_values()
+
+
+def test_waxing_matches_ephem(tmp_path, dates):
+    phases = LunarPhases(str(tmp_path))
+    expected = [ephem_waxing(date) for date in dates[::211].append(dates[-30:])]
+
+    assert phases.waxing(dates[::211].append(dates[-30:])).tolist() == expected
+    assert [phases.is_waxing(date) for date in dates[-30:]] == expected[-30:]
+
+
+def test_waxing_flips_with_ephem(tmp_path, near_moons):
+    phases = LunarPhases(str(tmp_path))
+    expected = [ephem_waxing(date) for date in near_moons]
+
+    # Waxing from the new moon on and waning from the full moon on, within the minutes.
+    assert expected[:10] == sorted(expected[:10]) and expected[10:] == sorted(expected[10:])[::-1]
+    assert len(set(expected[:10])) == len(set(expected[10:])) == 2
+    assert phases.waxing(near_moons).tolist() == expected
+    assert [phases.is_waxing(date) for date in near_moons] == expected
+
+
+def test_table_is_cached_on_disk(tmp_path, monkeypatch, dates):
+    LunarPhases(str(tmp_path)).waxing(dates)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        f'moon-phases-{year}.npz' for year in range(2018, 2023)
+    ]
+
+    monkeypatch.setattr(moon, 'compute_year', None)
+    assert LunarPhases(str(tmp_path)).waxing(dates).any()
+
+
+@pytest.mark.parametrize('broker_cls', [brokers.TestMoonBroker, brokers.TestReversedMoonBroker])
+def test_moon_brokers_keep_their_desires(dates, near_moons, broker_cls):
+    broker = broker_cls(0, [], None)
+    sample = dates[::401].append(near_moons)
+    desires = [broker._get_desire({'Date': date}) for date in sample]
+
+    waxing = np.array([ephem_waxing(date) for date in sample])
+    buy = waxing if broker_cls is brokers.TestMoonBroker else ~waxing
+    assert desires == [brokers.Desire.buy if b else brokers.Desire.sell for b in buy]
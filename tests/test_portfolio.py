@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitbroker import brokers
+from bitbroker.candles import write_candles
+from bitbroker.equity import broker_equity
+from bitbroker.equity import equity_curve
+from bitbroker.portfolio import allocation
+from bitbroker.portfolio import backtest_portfolio
+from bitbroker.portfolio import load_closes
+from bitbroker.portfolio import summary
+from bitbroker.run_simulation import simulate
+from bitbroker.vectorized import backtest
+
+
+@pytest.fixture
+def closes(random_walk):
+    columns = {f'P{seed}-USD': random_walk(500, seed)['Close'] for seed in range(3)}
+    return pd.DataFrame(columns)
+
+
+@pytest.mark.parametrize(
+    "broker_cls",
+    [
+        brokers.TestSimpleHullBroker,
+        brokers.TestCrossoverHullBroker,
+        brokers.TestJozefHullBroker,
+        brokers.TestHoldlBroker,
+        brokers.TestNoLossCrossoverHullBroker,
+    ],
+)
+@pytest.mark.parametrize("period", [2, 9])
+def test_products_match_backtest(closes, broker_cls, period):
+    portfolio = backtest_portfolio(closes, broker_cls, period, 0.001, capital=3000)
+
+    for product in closes.columns:
+        prices = closes[product].to_numpy()
+        usd, btc = backtest(broker_cls, prices, period, 0.001).history.to_arrays()
+        expected = equity_curve(usd[1:], btc[1:], prices[period * 2 :]).usd
+        assert portfolio.equity[product].to_numpy() == pytest.approx(expected, rel=1e-12)
+        assert portfolio.trades[product] == np.count_nonzero(np.diff(btc > 0))
+    assert portfolio.total.to_numpy() == pytest.approx(portfolio.equity.sum(axis=1))
+
+
+def test_moon_matches_event(closes):
+    raw_data = closes[['P1-USD']].rename(columns={'P1-USD': 'Close'})
+    raw_data['Date'] = raw_data.index
+    broker = simulate(raw_data, brokers.TestMoonBroker, 0, 0.001)
+
+    portfolio = backtest_portfolio(closes, brokers.TestMoonBroker, 0, 0.001, warmup=1)
+
+    expected = broker_equity(broker, raw_data['Close'].to_numpy()[1:]).usd
+    assert portfolio.equity['P1-USD'].to_numpy() == pytest.approx(expected / 3, rel=1e-12)
+
+
+def test_allocation(closes):
+    portfolio = backtest_portfolio(
+        closes, brokers.TestHoldlBroker, 5, 0, weights=[2, 1, 1], capital=4000
+    )
+    assert portfolio.capital.tolist() == [2000, 1000, 1000]
+    assert portfolio.equity.iloc[0].tolist() == pytest.approx([2000, 1000, 1000])
+
+    rows = summary(portfolio)
+    assert [row[0] for row in rows] == list(closes.columns) + ['TOTAL']
+    assert rows[-1][1] == pytest.approx(portfolio.total.iloc[-1])
+
+    with pytest.raises(ValueError):
+        allocation(closes.columns, [1, 1])
+
+
+def test_load_closes(tmp_path, random_walk):
+    first = random_walk(100, 0)
+    second = random_walk(100, 1).iloc[10:].drop(random_walk(100, 1).index[50])
+    paths = [str(tmp_path / 'data.BTC-USD.20190101.GRAN900.pkl')]
+    paths.append(str(tmp_path / 'data.ETH-USD.20190101.GRAN900.pkl'))
+    write_candles(first, paths[0])
+    write_candles(second, paths[1])
+
+    closes = load_closes(paths)
+
+    assert list(closes.columns) == ['BTC-USD', 'ETH-USD']
+    assert closes.index.equals(first.index[10:])
+    assert closes['ETH-USD'].iloc[40] == second['Close'].iloc[39]
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from bitbroker import positions
+from bitbroker.brokers import Balance
+from bitbroker.positions import BUY
+from bitbroker.positions import NONE
+from bitbroker.positions import run_policies
+from bitbroker.positions import run_policy
+from bitbroker.positions import SELL
+
+
+def test_no_loss_waits_for_a_profit():
+    desires = [BUY, SELL, NONE, SELL, BUY, SELL]
+    prices = [100.0, 90.0, 95.0, 110.0, 120.0, 100.0]
+
+    assert run_policy(desires, prices, 0) == (
+        [0, 1, 4, 5],
+        [Balance(0, 10), Balance(900, 0), Balance(0, 7.5), Balance(750, 0)],
+    )
+    assert run_policy(desires, prices, 0, no_loss=True) == (
+        [0, 3, 4],
+        [Balance(0, 10), Balance(1100, 0), Balance(0, 1100 / 120)],
+    )
+
+
+@pytest.mark.skipif(positions.njit is None, reason='numba is not installed')
+@pytest.mark.parametrize('no_loss', [False, True])
+def test_compiled_matches_python(monkeypatch, no_loss):
+    rng = np.random.default_rng(0)
+    desires = rng.choice([BUY, SELL, NONE], 5000)
+    prices = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, 5000)))
+
+    compiled = run_policy(desires, prices, 0.001, no_loss=no_loss)
+    monkeypatch.setattr(positions, '_compiled_trades', None)
+    assert run_policy(desires, prices, 0.001, no_loss=no_loss) == compiled
+
+
+@pytest.mark.parametrize('no_loss', [False, True])
+def test_policies_match_policy_per_fee(no_loss):
+    rng = np.random.default_rng(1)
+    desires = rng.choice([BUY, SELL, NONE], 2000)
+    prices = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+    fees = [0, 0.001, 0.01]
+
+    counts, ticks, balances = run_policies(desires, prices, fees, no_loss=no_loss)
+    for fee, count, fee_ticks, fee_balances in zip(fees, counts, ticks, balances):
+        assert run_policy(desires, prices, fee, no_loss=no_loss) == (
+            fee_ticks[:count].tolist(),
+            [Balance(*balance) for balance in fee_balances[:count].tolist()],
+        )
@@ -0,0 +1,149 @@
+import importlib.util
+from argparse import Namespace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitbroker.candles import CandleStore
+from bitbroker.candles import write_candles
+from bitbroker.resample import aggregate
+from bitbroker.resample import Pyramid
+
+spec = importlib.util.spec_from_file_location(
+    'get_historic_data', Path(__file__).parents[1] / 'tools' / 'get_historic_data.py'
+)
+get_historic_data = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(get_historic_data)
+
+RULES = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+@pytest.fixture
+def minutes():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('20190101 00:07', periods=5000, freq='min')
+    # Missing minutes, a missing hour included.
+    keep = rng.random(len(dates)) > 0.1
+    keep[600:660] = False
+    dates = dates[keep]
+
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.001, len(dates))))
+    spread = rng.random(len(dates))
+    frame = pd.DataFrame(
+        {
+            'Date': dates,
+            'Low': close - spread,
+            'High': close + spread,
+            'Open': close + rng.normal(0, 0.1, len(dates)),
+            'Close': close,
+            'Volume': rng.random(len(dates)),
+        },
+        index=dates,
+    )
+    return frame
+
+
+def expected_candles(frame, seconds):
+    expected = frame.drop(columns='Date').resample(f'{seconds}s').agg(RULES).dropna()
+    return expected.assign(Date=expected.index)
+
+
+@pytest.mark.parametrize("seconds", [300, 900, 3600, 86400])
+def test_aggregate_matches_resample(minutes, seconds):
+    arrays = {column: minutes[column].to_numpy() for column in minutes}
+
+    result = pd.DataFrame(aggregate(arrays, seconds))
+
+    expected = expected_candles(minutes, seconds)
+    assert result['Date'].tolist() == expected.index.tolist()
+    for column in RULES:
+        assert result[column].tolist() == pytest.approx(expected[column].tolist(), rel=1e-12)
+
+
+def test_pyramid_updates_incrementally(tmp_path, minutes):
+    path = str(tmp_path / 'data.BTC-USD.GRAN60.candles')
+    CandleStore.create(path, minutes[:3000])
+    pyramid = Pyramid(path)
+    assert pyramid.granularities == [300, 900, 3600, 86400]
+
+    first = pyramid.timeframe(900)
+    pd.testing.assert_frame_equal(
+        first[list(RULES)],
+        expected_candles(minutes[:3000], 900)[list(RULES)],
+        check_freq=False,
+        check_index_type=False,
+        check_names=False,
+    )
+    stored = len(CandleStore(pyramid.level_path(900)))
+    assert stored == len(first) - 1
+
+    CandleStore(path).append(minutes[3000:])
+    frames = pyramid.timeframes([300, 3600], start='20190101 12:00')
+
+    assert len(CandleStore(pyramid.level_path(900))) > stored
+    for seconds, frame in frames.items():
+        expected = expected_candles(minutes, seconds).loc['20190101 12:00':]
+        pd.testing.assert_frame_equal(
+            frame[list(RULES)],
+            expected[list(RULES)],
+            check_freq=False,
+            check_names=False,
+            check_index_type=False,
+        )
+        store = CandleStore(pyramid.level_path(seconds))
+        complete = expected_candles(minutes, seconds).index[: len(store)]
+        assert store.to_frame()['Date'].tolist() == complete.tolist()
+
+
+def test_pyramid_of_pickle(tmp_path, minutes):
+    path = str(tmp_path / 'data.pkl')
+    write_candles(minutes, path)
+
+    result = Pyramid(path, [3600]).timeframe(3600)
+
+    assert result['Close'].tolist() == expected_candles(minutes, 3600)['Close'].tolist()
+    with pytest.raises(ValueError):
+        Pyramid(path, [3600]).timeframe(900)
+
+
+def test_pyramid_of_downloaded_pickle(tmp_path, minutes, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args = Namespace(product='BTC-USD', startdate='2019-01-01', granularity=60, format='pd')
+    rows = minutes[get_historic_data.CANDLE_COLUMNS].copy()
+    rows['Date'] = (minutes.index - pd.Timestamp(0)) // pd.Timedelta('1s')
+    get_historic_data.save(rows.values.tolist()[::-1], args)
+    path = get_historic_data.generate_filename(args) + '.xz'
+
+    pyramid = Pyramid(path)
+    result = pyramid.timeframe(300)
+
+    assert pyramid.granularities == [300, 900, 3600, 86400]
+    assert result['Close'].tolist() == expected_candles(minutes, 300)['Close'].tolist()
+
+
+def test_pyramid_rebuilds_rewritten_base(tmp_path, minutes):
+    path = str(tmp_path / 'data.candles')
+    CandleStore.create(path, minutes)
+    Pyramid(path).update()
+
+    CandleStore.create(path, minutes[:1000])
+    result = Pyramid(path).timeframe(300)
+
+    assert result['Close'].tolist() == expected_candles(minutes[:1000], 300)['Close'].tolist()
+
+
+def test_pyramid_drops_levels_of_shrunk_base(tmp_path, minutes):
+    path = str(tmp_path / 'data.candles')
+    CandleStore.create(path, minutes)
+    Pyramid(path).update()
+
+    CandleStore.create(path, minutes[:30])
+    pyramid = Pyramid(path, [900, 3600])
+    result = pyramid.timeframes([900, 3600])
+
+    assert pyramid._level(3600) is None
+    for seconds in [900, 3600]:
+        expected = expected_candles(minutes[:30], seconds)
+        assert result[seconds]['Close'].tolist() == expected['Close'].tolist()
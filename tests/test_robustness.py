@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from bitbroker import brokers
+from bitbroker.robustness import block_bootstrap
+from bitbroker.robustness import evaluate_paths
+from bitbroker.robustness import GENERATORS
+from bitbroker.robustness import regime_shuffle
+from bitbroker.robustness import robustness
+from bitbroker.robustness import summary
+from bitbroker.run_simulation import get_order_frequency
+from bitbroker.vectorized import backtest
+
+
+@pytest.mark.parametrize("generator", list(GENERATORS))
+def test_generators(random_walk, generator):
+    close = random_walk(500)['Close'].to_numpy()
+
+    paths = GENERATORS[generator](close, 7, np.random.default_rng(0), block=20, regime=60)
+    again = GENERATORS[generator](close, 7, np.random.default_rng(0), block=20, regime=60)
+
+    assert paths.shape == (7, len(close))
+    assert (paths[:, 0] == close[0]).all()
+    assert (paths == again).all()
+    assert len(np.unique(paths[:, -1])) > 1 or generator == 'regimes'
+
+
+def test_resampled_returns(random_walk):
+    close = random_walk(500)['Close'].to_numpy()
+    returns = np.diff(np.log(close))
+
+    shuffled = regime_shuffle(close, 5, np.random.default_rng(0), regime=60)
+    assert shuffled[:, -1] == pytest.approx(close[-1])
+    for path in np.diff(np.log(shuffled)):
+        assert np.sort(path) == pytest.approx(np.sort(returns))
+
+    bootstrapped = np.diff(np.log(block_bootstrap(close, 5, np.random.default_rng(0))))
+    assert np.isin(np.round(bootstrapped, 12), np.round(returns, 12)).all()
+
+
+@pytest.mark.parametrize(
+    "broker_cls", [brokers.TestSimpleHullBroker, brokers.TestNoLossCrossoverHullBroker]
+)
+def test_evaluate_paths_matches_backtest(random_walk, broker_cls):
+    raw_data = random_walk(500)
+    paths = GENERATORS['gbm'](raw_data['Close'].to_numpy(), 4, np.random.default_rng(1))
+
+    balance, drawdown, order_frequency = evaluate_paths(
+        paths, raw_data.index, broker_cls, 5, 0.001
+    )
+
+    for i, path in enumerate(paths):
+        expected = backtest(broker_cls, path, 5, 0.001)
+        assert balance[i] == pytest.approx(expected.balance.USD, rel=1e-12)
+        assert order_frequency[i] == pytest.approx(get_order_frequency(expected))
+    assert (drawdown <= 0).all()
+
+
+def test_robustness_is_reproducible(random_walk):
+    raw_data = random_walk(500)
+    run = dict(broker_cls=brokers.TestSimpleHullBroker, period=5, fee=0.001, paths=10)
+
+    results = robustness(raw_data, **run, chunk_size=4, processes=2, block=20, regime=60)
+    again = robustness(raw_data, **run, chunk_size=4, processes=1, block=20, regime=60)
+    other = robustness(raw_data, **run, chunk_size=4, seed=1, block=20, regime=60)
+
+    assert len(results) == 30
+    assert results['path'].tolist() == list(range(10)) * 3
+    assert results.equals(again)
+    assert not results.equals(other)
+    assert [row[:2] for row in summary(results)][:3] == [
+        ['bootstrap', 'balance'],
+        ['bootstrap', 'drawdown'],
+        ['bootstrap', 'order_frequency'],
+    ]
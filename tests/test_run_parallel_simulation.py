@@ -0,0 +1,42 @@
+import pytest
+
+from bitbroker import brokers
+from bitbroker import run_parallel_simulation
+from bitbroker.equity import get_usd_series
+from bitbroker.run_simulation import simulate
+
+
+@pytest.mark.parametrize(
+    "broker_cls, fee, period",
+    [(brokers.TestSimpleHullBroker, 0.001, 5), (brokers.TestHoldlBroker, 0, 0)],
+)
+def test_parallel_helper_simulation(tmp_path, random_walk, broker_cls, fee, period):
+    raw_data = random_walk(200)
+    run_parallel_simulation.share_data(raw_data, tmp_path)
+    run_parallel_simulation.load_shared_data(tmp_path)
+
+    name, values = run_parallel_simulation.parallel_helper_simulation((broker_cls, fee, period))
+
+    broker, index = simulate(raw_data, broker_cls, period, fee, return_index=True)
+    expected = get_usd_series(broker, index, raw_data)
+    assert name == f'{broker_cls.__name__}_{fee:.4f}_{period}'
+    assert values.tolist() == expected.tolist()
+
+
+def test_parallel_helper_sweep(tmp_path, random_walk):
+    raw_data = random_walk(200)
+    run_parallel_simulation.share_data(raw_data, tmp_path)
+    run_parallel_simulation.load_shared_data(tmp_path)
+    combinations = [
+        (brokers.TestSimpleHullBroker, 0.001, 5),
+        (brokers.TestCrossoverHullBroker, 0, 5),
+        (brokers.TestCrossoverHullBroker, 0.001, 3),
+        (brokers.TestHoldlBroker, 0, 0),
+    ]
+
+    results = run_parallel_simulation.parallel_helper_sweep(combinations)
+
+    expected = map(run_parallel_simulation.parallel_helper_simulation, combinations)
+    expected = {name: values.tolist() for name, values in expected}
+    assert {name: values.tolist() for name, values in results} == expected
+    assert len(results) == len(combinations)
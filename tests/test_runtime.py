@@ -0,0 +1,47 @@
+import asyncio
+import itertools
+
+from bitbroker import brokers
+from bitbroker.run_simulation import simulate
+from bitbroker.runtime import Runtime
+from bitbroker.runtime import simulate_many
+
+
+def test_simulate_many_matches_simulate(random_walk):
+    raw_data = random_walk(300)
+    combinations = [
+        (brokers.TestSimpleHullBroker, 5, 0.001),
+        (brokers.TestCrossoverHullBroker, 9, 0),
+        (brokers.TestNoLossCrossoverHullBroker, 4, 0.001),
+        (brokers.TestJozefHullBroker, 16, 0),
+        (brokers.TestMoonBroker, 0, 0.001),
+    ]
+
+    finished = simulate_many(raw_data, combinations, queue_size=4)
+
+    for broker, (broker_cls, period, fee) in zip(finished, combinations):
+        expected = simulate(raw_data, broker_cls, period, fee)
+        assert broker.balance == expected.balance
+        assert broker.history == expected.history
+
+
+async def endless_feed():
+    for i in itertools.count():
+        yield {'Close': 1000.0 + i % 7}
+        await asyncio.sleep(0)
+
+
+def test_runtime_stops_on_timeout():
+    runtime = Runtime(endless_feed(), queue_size=2)
+    subscriptions = [
+        runtime.add(brokers.TestSimpleHullBroker(2, [1000.0] * 4, None)),
+        runtime.add(brokers.TestHoldlBroker(0, [], None), start=10),
+    ]
+
+    asyncio.run(runtime.run(timeout=0.2))
+
+    fast, late = subscriptions
+    assert fast.latency.count > 10
+    assert late.latency.count == fast.latency.count - 10
+    assert len(fast.broker.history) == fast.latency.count + 1
+    assert fast.latency.max >= fast.latency.mean > 0
@@ -0,0 +1,41 @@
+import pytest
+
+from bitbroker import brokers
+from bitbroker.equity import get_usd_values
+from bitbroker.run_simulation import get_order_frequency
+from bitbroker.run_simulation import simulate
+from bitbroker.sweep import grid
+from bitbroker.sweep import sweep
+from bitbroker.sweep import sweep_values
+
+BROKER_CLASSES = [
+    brokers.TestSimpleHullBroker,
+    brokers.TestCrossoverHullBroker,
+    brokers.TestJozefHullBroker,
+    brokers.TestNoLossCrossoverHullBroker,
+]
+
+
+def test_sweep_matches_simulate(random_walk):
+    raw_data = random_walk(600)
+    periods, fees = [2, 4, 9, 18], [0, 0.0007, 0.001]
+
+    results = sweep(raw_data['Close'].values, BROKER_CLASSES, periods, fees)
+
+    assert len(results) == len(BROKER_CLASSES) * len(periods) * len(fees)
+    for row in results.itertuples():
+        broker_cls = getattr(brokers, row.broker)
+        expected = simulate(raw_data, broker_cls, row.period, row.fee)
+        assert row.balance == expected.balance.USD
+        assert row.order_frequency == pytest.approx(get_order_frequency(expected))
+
+
+def test_sweep_values_match_simulate(random_walk):
+    raw_data = random_walk(300)
+    close = raw_data['Close'].values
+
+    combinations = grid(BROKER_CLASSES, [7, 3], [0, 0.001])
+
+    for (broker_cls, period, fee), values in zip(combinations, sweep_values(close, combinations)):
+        expected = simulate(raw_data, broker_cls, period, fee)
+        assert values.tolist() == get_usd_values(expected, close[period * 2 + 1 :]).tolist()
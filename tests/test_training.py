@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from bitbroker.features import write_features
+
+tf = pytest.importorskip('tensorflow')
+training = pytest.importorskip('bitbroker.training')
+
+
+@pytest.fixture
+def columns(random_walk, tmp_path):
+    close = random_walk(3000)['Close']
+    write_features(close.index, close.to_numpy(), str(tmp_path / 'features.candles'))
+    return training.load_columns(str(tmp_path / 'features.candles'))
+
+
+def rows_of(dataset):
+    x, y = zip(*[(x.numpy(), y.numpy()) for x, y in dataset])
+    return np.concatenate(x), np.concatenate(y)
+
+
+def test_split_by_timestamp(columns):
+    train, val = training.split_rows(columns['Date'], '20190115')
+
+    assert train.start == 0 and train.stop == val.start and val.stop == len(columns['Date'])
+    assert columns['Date'][train.stop - 1] < np.datetime64('2019-01-15')
+    assert columns['Date'][val.start] >= np.datetime64('2019-01-15')
+
+
+def test_features_leave_out_the_targets(columns):
+    features = training.feature_names(columns)
+
+    assert not {'y', '%y', 'log10y', 'booly'} & set(features)
+    # No feature of a candle tells on its own whether the next close is higher.
+    booly = np.asarray(columns['booly'][:-1], dtype=bool)
+    for feature in features:
+        values = np.asarray(columns[feature][:-1], dtype=float)
+        assert not np.array_equal(values > 0, booly) and not np.array_equal(values < 0, booly)
+
+
+def test_dataset_streams_rows_in_order(columns):
+    features = training.feature_names(columns)
+    rows = range(100, 2900)
+    dataset = training.make_dataset(columns, rows, features, batch_size=64, chunk_size=500)
+
+    x, y = rows_of(dataset)
+    frame = training.rows_frame(columns, rows, features)
+    assert 'Date' not in features and 'booly' not in features
+    np.testing.assert_array_equal(x, frame.to_numpy(np.float32))
+    np.testing.assert_array_equal(y, columns['booly'][100:2900])
+
+
+def test_shuffled_dataset_keeps_every_row(columns):
+    features = training.feature_names(columns)
+    rows = range(0, len(columns['Date']))
+    dataset = training.make_dataset(
+        columns, rows, features, chunk_size=300, shuffle_buffer=1000, interleave=3, seed=0
+    )
+
+    x, _ = rows_of(dataset)
+    expected = training.rows_frame(columns, rows, features).to_numpy(np.float32)
+    assert not np.array_equal(x, expected)
+    np.testing.assert_array_equal(np.unique(x, axis=0), np.unique(expected, axis=0))
@@ -0,0 +1,34 @@
+import pytest
+
+from bitbroker import brokers
+from bitbroker.run_simulation import simulate
+
+
+@pytest.mark.parametrize(
+    "broker_cls",
+    [
+        brokers.TestSimpleHullBroker,
+        brokers.TestCrossoverHullBroker,
+        brokers.TestJozefHullBroker,
+        brokers.TestHoldlBroker,
+        brokers.TestNoLossCrossoverHullBroker,
+        type('TestInverse', (brokers.TestBroker, brokers.CrossoverInverseHullBroker), {}),
+        type('TestCombo', (brokers.TestBroker, brokers.CrossoverJozefComboHullBroker), {}),
+        type('TestNoLossJozef', (brokers.TestJozefHullBroker, brokers.NoLossBroker), {}),
+    ],
+)
+@pytest.mark.parametrize("period", [2, 5, 16, 37])
+@pytest.mark.parametrize("fee", [0, 0.001])
+def test_vectorized_matches_event(random_walk, broker_cls, period, fee):
+    raw_data = random_walk()
+
+    event = simulate(raw_data, broker_cls, period, fee)
+    vectorized = simulate(raw_data, broker_cls, period, fee, mode='vectorized')
+
+    assert vectorized.balance == event.balance
+    assert vectorized.history == event.history
+
+
+def test_vectorized_unsupported_broker(random_walk):
+    with pytest.raises(NotImplementedError):
+        simulate(random_walk(), brokers.TestMoonBroker, 5, 0, mode='vectorized')
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from bitbroker import brokers
+from bitbroker import vectorized
+from bitbroker.cache import FeatureCache
+from bitbroker.indicators import hma
+from bitbroker.vectorized import backtest
+from bitbroker.vectorized import HullCache
+from bitbroker.walk_forward import Fold
+from bitbroker.walk_forward import score
+from bitbroker.walk_forward import split_folds
+from bitbroker.walk_forward import walk_fold
+from bitbroker.walk_forward import walk_forward
+
+BROKER_CLASSES = [
+    brokers.TestSimpleHullBroker,
+    brokers.TestJozefHullBroker,
+    brokers.TestNoLossCrossoverHullBroker,
+]
+
+
+def test_split_folds():
+    dates = pd.date_range('20190101', periods=100, freq='D')
+
+    assert split_folds(dates, 3) == [Fold(0, 25, 50), Fold(25, 50, 75), Fold(50, 75, 100)]
+    assert split_folds(dates, 3, anchored=True)[-1] == Fold(0, 75, 100)
+    with pytest.raises(ValueError):
+        split_folds(dates[:3], 5)
+
+
+@pytest.mark.parametrize("broker_cls", BROKER_CLASSES)
+@pytest.mark.parametrize("period, start", [(3, 6), (5, 150), (16, 301)])
+def test_score_matches_backtest(random_walk, broker_cls, period, start):
+    close = random_walk(600)['Close'].values
+    hulls = HullCache(close)
+    for n in [period, period * 2]:
+        hulls.hma(n)
+
+    balance, _ = score(broker_cls, hulls, period, 0.001, start, 450)
+
+    expected = backtest(broker_cls, close[:450], period, 0.001, warmup=start)
+    assert balance == pytest.approx(expected.balance.USD)
+
+
+def test_walk_fold_without_periods(random_walk):
+    hulls = HullCache(random_walk(300)['Close'].values)
+
+    with pytest.raises(ValueError, match='longest that does is 19'):
+        walk_fold(brokers.TestSimpleHullBroker, hulls, Fold(0, 40, 80), [20, 30], 0)
+
+
+def test_walk_fold_reads_hulls_from_cache(random_walk, tmp_path, monkeypatch):
+    raw_data = random_walk(600)
+    close = raw_data['Close'].values
+    periods = [3, 5, 8]
+    needed = {n for period in periods for n in [period, period * 2]}
+    parent = HullCache(close, FeatureCache(str(tmp_path)))
+    for n in needed:
+        parent.hma(n)
+
+    calls = []
+    monkeypatch.setattr(vectorized, 'hma', lambda *args: calls.append(args) or hma(*args))
+    # Like a worker of walk_forward, which reads the series the parent computed.
+    cache = FeatureCache(str(tmp_path))
+    hulls = HullCache(close, cache)
+    for fold in split_folds(raw_data.index, 2):
+        walk_fold(brokers.TestCrossoverHullBroker, hulls, fold, periods, 0)
+
+    assert calls == [] and cache.misses == 0 and cache.hits == len(needed)
+
+
+def test_walk_forward_matches_folds(random_walk):
+    raw_data = random_walk(900)
+    folds = split_folds(raw_data.index, 3)
+    periods = range(2, 30, 3)
+
+    results = walk_forward(raw_data, BROKER_CLASSES, periods, 0.001, folds, processes=2)
+
+    assert len(results) == len(folds) * len(BROKER_CLASSES)
+    hulls = HullCache(raw_data['Close'].values)
+    for row in results.itertuples():
+        broker_cls = getattr(brokers, row.broker)
+        expected = walk_fold(broker_cls, hulls, folds[row.fold], periods, 0.001)
+        assert (row.period, row.train_balance, row.test_balance) == pytest.approx(expected[:3])
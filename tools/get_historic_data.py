@@ -2,14 +2,49 @@
 import argparse
 import datetime
 import json
+import os
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from itertools import islice
 
 import pandas as pd
 import requests
 from tqdm import tqdm
 
+from bitbroker.gaps import drop_duplicates
+from bitbroker.gaps import find_gaps
+from bitbroker.gaps import print_gap_report
+from bitbroker.gaps import to_seconds
+
 
 API_RESPONSE_LIMIT = 300
+CANDLE_COLUMNS = ['Date', 'Low', 'High', 'Open', 'Close', 'Volume']
+MAX_RETRIES = 8
+MAX_BACKOFF = 60
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
 
 
 def generate_filename(args):
@@ -20,58 +55,164 @@ def generate_filename(args):
     return f'data.{args.product}.{args.startdate}.GRAN{args.granularity}.{format_ext}'
 
 
-def main(args):
+def utcnow():
+    # Coinbase dates candles in UTC, naive datetimes here are all UTC.
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
 
-    data = []
+def get_windows(args, now=None, start=None):
+    now = utcnow() if now is None else now
     date_range = pd.date_range(
-        args.startdate,
-        pd.Timestamp.now(),
-        freq=f'{args.granularity * API_RESPONSE_LIMIT}S',
+        args.startdate if start is None else start,
+        now,
+        freq=pd.Timedelta(seconds=args.granularity * API_RESPONSE_LIMIT),
     )
-    date_range = date_range.to_pydatetime().tolist() + [datetime.datetime.now()]
+    date_range = date_range.to_pydatetime().tolist() + [now]
 
-    reversed_date_range = reversed(date_range)
-    end = next(reversed_date_range)
-    for start in tqdm(reversed_date_range, total=len(date_range)):
+    # Newest first, the order in which Coinbase returns candles inside a window.
+    return list(zip(date_range[:-1], date_range[1:]))[::-1]
 
-        params = {
-            'start': start.isoformat(),
-            'end': end.isoformat(),
-            'granularity': args.granularity,
-        }
 
-        while True:
-            response = requests.get(args.endpoint, params=params)
+def window_key(window):
+    start, end = window
+    return start.isoformat(), end.isoformat()
+
+
+def fetch_window(args, bucket, start, end):
+    params = {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': args.granularity,
+    }
+
+    for attempt in range(MAX_RETRIES):
+        bucket.acquire()
+        try:
+            response = requests.get(args.endpoint, params=params, timeout=30)
+        except requests.RequestException as error:
+            reason = error
+        else:
             if response.ok:
-                break
-            print('Response not ok:', response.text)
-            time.sleep(10)
+                return response.json()
+            if response.status_code != 429 and response.status_code < 500:
+                response.raise_for_status()
+            reason = response.text
+
+        delay = min(MAX_BACKOFF, args.backoff * 2 ** attempt)
+        print(f'Response not ok ({reason}), retrying in {delay} s')
+        time.sleep(delay)
+
+    raise RuntimeError(f'Giving up on window {params["start"]} - {params["end"]}')
+
+
+def read_journal(path):
+    done = {}
+    if not os.path.exists(path):
+        return done
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                start, end, candles = json.loads(line)
+            except ValueError:
+                # a crash may leave the last window half written
+                continue
+            done[start, end] = candles
+
+    return done
+
+
+def download(args, windows, journal_path):
+    """Fetch all ``windows`` not yet in the journal, appending each one as it arrives."""
+    done = read_journal(journal_path)
+    pending = [window for window in windows if window_key(window) not in done]
+    bucket = TokenBucket(args.rate)
+
+    with open(journal_path, 'a', encoding='utf-8') as journal, ThreadPoolExecutor(
+        args.workers
+    ) as executor, tqdm(total=len(windows), initial=len(windows) - len(pending)) as progress:
+        pending = iter(pending)
+        in_flight = {}
+
+        def submit():
+            for window in islice(pending, args.workers - len(in_flight)):
+                in_flight[executor.submit(fetch_window, args, bucket, *window)] = window
+
+        submit()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = window_key(in_flight.pop(future))
+                done[key] = future.result()
+                journal.write(json.dumps([*key, done[key]]) + '\n')
+                journal.flush()
+                progress.update()
+            submit()
+
+    return done
+
+
+def load_saved(args):
+    """Candles of an earlier run, newest first, in the JSON layout."""
+    filename = generate_filename(args)
 
-        data.extend(response.json())
+    if args.format == 'pd':
+        df = pd.read_pickle(filename + '.xz')
+        timestamps = (df['Date'] - pd.Timestamp(0)) // pd.Timedelta('1s')
+        columns = [df[column].tolist() for column in CANDLE_COLUMNS[1:]]
+        return [list(candle) for candle in zip(timestamps.tolist(), *columns)]
 
-        end = start
+    elif args.format == 'json':
+        with open(filename, encoding='utf-8') as f:
+            return json.load(f)
 
-    last = data[0]
-    new_data = [last]
-    for dictum in data[1:]:
-        if last[0] - dictum[0] != 0:
-            new_data.append(dictum)
-        last = dictum
-    data = new_data
 
+def save(data, args):
     filename = generate_filename(args)
-    if args.format == 'pd':
 
-        df = pd.DataFrame(data, columns=['Date', 'Low', 'High', 'Open', 'Close', 'Volume'])
+    if args.format == 'pd':
+        path = filename + '.xz'
+        df = pd.DataFrame(data, columns=CANDLE_COLUMNS)
         df['Date'] = pd.to_datetime(df['Date'], unit='s')
         df.index = pd.DatetimeIndex(df['Date'])
-        df.to_pickle(filename + '.xz')
+        df.to_pickle(path + '.tmp', compression='xz')
 
     elif args.format == 'json':
-
-        with open(filename, 'w', encoding='utf-8') as f:
+        path = filename
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False)
 
+    os.replace(path + '.tmp', path)
+
+
+def merge(new_data, old_data):
+    """Join newest-first candle lists; the fresh download wins where they overlap."""
+    if not new_data:
+        return old_data
+    oldest_new = new_data[-1][0]
+    return new_data + [candle for candle in old_data if candle[0] < oldest_new]
+
+
+def main(args):
+
+    filename = generate_filename(args)
+    journal_path = filename + '.part'
+
+    old_data, start = [], None
+    if args.update:
+        old_data = load_saved(args)
+        # the last saved candle may have been incomplete, fetch it again
+        start = datetime.datetime.fromtimestamp(old_data[0][0], datetime.timezone.utc)
+        start = start.replace(tzinfo=None)
+    windows = get_windows(args, start=start)
+
+    done = download(args, windows, journal_path)
+    data = [candle for window in windows for candle in done[window_key(window)]]
+    data = drop_duplicates(merge(data, old_data))
+
+    save(data, args)
+    os.remove(journal_path)
+
     print('Gathered data saved to ', filename)
     print()
 
@@ -85,25 +226,13 @@ def test(args):
 
     if args.format == 'json':
         with open(filename, encoding='utf-8') as f:
-            data = json.load(f)
+            timestamps = [candle[0] for candle in json.load(f)]
 
     elif args.format == 'pd':
 
-        # TODO
-        raise NotImplementedError
-
-    last, counter = data[0], 0
-    for i, dictum in enumerate(data[1:]):
-        if last[0] - dictum[0] != args.granularity:
-            counter += 1
-            print(f'Index: {i}', end='\t')
-            print(f'Dates: {datetime.datetime.fromtimestamp(dictum[0])}', end=' ')
-            print(f'{datetime.datetime.fromtimestamp(last[0])}', end='\t')
-            print('Difference: {last[0] - dictum[0]} s')
-        last = dictum
+        timestamps = to_seconds(pd.read_pickle(filename + '.xz')['Date'])
 
-    print()
-    print(f'Summary:\nTotal gathered entries: {len(data)}\nGaps count: {counter}')
+    print_gap_report(find_gaps(timestamps, args.granularity), len(timestamps))
 
 
 if __name__ == "__main__":
@@ -136,6 +265,30 @@ if __name__ == "__main__":
         choices=['json', 'pd'],
         help='Requested format of the saved data.',
     )
+    parser.add_argument(
+        '--update',
+        default=False,
+        action='store_true',
+        help='Only fetch candles newer than the last one in the existing output file.',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='Maximum number of windows downloaded at the same time.',
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=3,
+        help='Maximum number of requests per second.',
+    )
+    parser.add_argument(
+        '--backoff',
+        type=float,
+        default=1,
+        help='Delay in seconds before the first retry, doubled on every next one.',
+    )
 
     args = parser.parse_args()
 
@@ -143,5 +296,5 @@ if __name__ == "__main__":
 
     print(args)
 
-    # main(args)
+    main(args)
     test(args)
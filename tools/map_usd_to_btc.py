@@ -1,18 +1,16 @@
-import pandas as pd
-from tqdm import tqdm
+from bitbroker.candles import read_candles
+from bitbroker.candles import write_candles
+from bitbroker.equity import btc_values
 
 
 def main():
-    data = pd.read_pickle('data/data.BTC-USD.2016-01-01.GRAN900.jozef.pkl.xz')
+    data = read_candles('data/data.BTC-USD.2016-01-01.GRAN900.jozef.pkl.xz')
 
     normalization_ratio = data.iloc[0]['Close'] / 1000
-    for label in tqdm(data.columns):
-        if 'Broker' not in label:
-            continue
+    labels = [label for label in data.columns if 'Broker' in label]
+    data[labels] = btc_values(data[labels], data['Close'], normalization_ratio)
 
-        data[label] = data[label] / data['Close'] * normalization_ratio
-
-    data.to_pickle('data/data.BTC-USD.2016-01-01.GRAN900.jozef.BTC.pkl.xz')
+    write_candles(data, 'data/data.BTC-USD.2016-01-01.GRAN900.jozef.BTC.pkl.xz')
 
 
 if __name__ == "__main__":
@@ -1,28 +1,17 @@
-import datetime
 import json
 import sys
 
+from bitbroker.gaps import drop_duplicates
+from bitbroker.gaps import find_gaps
+from bitbroker.gaps import print_gap_report
+
 
 with open(sys.argv[1], encoding='utf-8') as f:
     data = json.load(f)
 
-last = data[0]
-new_data = [last]
-for dictum in data[1:]:
-    if last[0] - dictum[0] != 0:
-        new_data.append(dictum)
-    last = dictum
-data = new_data
+data = drop_duplicates(data)
 
 with open("lolol.json", 'w') as f:
     json.dump(data, f)
 
-last, counter = data[0], 0
-for i, dictum in enumerate(data[1:]):
-    if last[0] - dictum[0] != int(sys.argv[2]):
-        counter += 1
-        print(f'Index: {i}', end='\t')
-        print(f'Dates: {datetime.datetime.fromtimestamp(dictum[0])}', end=' ')
-        print(f'{datetime.datetime.fromtimestamp(last[0])}', end='\t')
-        print('Difference: {last[0] - dictum[0]} s')
-    last = dictum
+print_gap_report(find_gaps([candle[0] for candle in data], int(sys.argv[2])), len(data))